@@ -0,0 +1,153 @@
+# aggregator/bench/feedfarm.py
+"""
+Синтетическая «ферма» лент для бенчмарков: локальный HTTP-сервер,
+который генерирует N RSS/Atom-лент по M записей и страницы статей к ним.
+
+Каждый источник слушает свой порт — для HostLimiter это разные хосты,
+как и у настоящих лент. Содержимое детерминировано (зависит только от
+параметров), поэтому ETag стабилен между прогонами.
+"""
+from __future__ import annotations
+
+import hashlib
+import multiprocessing as mp
+import threading
+import time
+from dataclasses import dataclass, asdict
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+BASE_TS = 1788220800  # 2026-09-01T00:00:00Z — фиксированная точка отсчёта дат
+WORDS = ("полуприцеп тягач цистерна рынок выставка дилер премьера шасси ось "
+         "trailer krone schmitz market fleet axle reefer tipper").split()
+
+
+@dataclass
+class FarmParams:
+    sources: int = 20
+    entries: int = 30
+    summary_bytes: int = 400
+    article_bytes: int = 8000
+    latency_ms: int = 50
+    etag: bool = True
+
+
+def _text(seed: str, size: int) -> str:
+    h = int(hashlib.md5(seed.encode()).hexdigest(), 16)
+    out, n = [], 0
+    while n < size:
+        w = WORDS[h % len(WORDS)]
+        h = (h * 6364136223846793005 + 1442695040888963407) & (2 ** 64 - 1)
+        out.append(w)
+        n += len(w) + 1
+    return " ".join(out)
+
+
+def entry_ts(src: int, j: int) -> int:
+    # источники публикуются с разной частотой: от раза в 2 часа до раза в 2 суток
+    step = 7200 * (1 + src % 24)
+    return BASE_TS - j * step
+
+
+def make_feed(src: int, p: FarmParams, base: str) -> bytes:
+    atom = src % 2 == 1
+    parts = []
+    for j in range(p.entries):
+        link = f"{base}/article/{src}/{j}"
+        title = f"Новость {src}-{j}: " + _text(f"t{src}-{j}", 60)
+        summary = f"<p>{_text(f's{src}-{j}', p.summary_bytes)}</p>"
+        ts = entry_ts(src, j)
+        if atom:
+            iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+            parts.append(f"<entry><id>urn:farm:{src}:{j}</id><title>{title}</title>"
+                         f"<link href=\"{link}\"/><updated>{iso}</updated>"
+                         f"<summary type=\"html\"><![CDATA[{summary}]]></summary></entry>")
+        else:
+            parts.append(f"<item><guid>farm-{src}-{j}</guid><title>{title}</title><link>{link}</link>"
+                         f"<pubDate>{formatdate(ts, usegmt=True)}</pubDate>"
+                         f"<description><![CDATA[{summary}]]></description>"
+                         f"<enclosure url=\"{base}/img/{src}/{j}.jpg\" type=\"image/jpeg\"/></item>")
+    if atom:
+        doc = ("<?xml version=\"1.0\" encoding=\"utf-8\"?><feed xmlns=\"http://www.w3.org/2005/Atom\">"
+               f"<title>farm {src}</title><id>urn:farm:{src}</id>{''.join(parts)}</feed>")
+    else:
+        doc = ("<?xml version=\"1.0\" encoding=\"utf-8\"?><rss version=\"2.0\"><channel>"
+               f"<title>farm {src}</title><link>{base}</link>{''.join(parts)}</channel></rss>")
+    return doc.encode("utf-8")
+
+
+def make_article(src: int, j: int, p: FarmParams, base: str) -> bytes:
+    paras, n, k = [], 0, 0
+    while n < p.article_bytes:
+        t = _text(f"a{src}-{j}-{k}", 300)
+        paras.append(f"<p>{t}</p>")
+        n += len(t) + 7
+        k += 1
+    doc = (f"<!doctype html><html><head><meta charset=\"utf-8\"><title>Новость {src}-{j}</title>"
+           f"<meta property=\"og:image\" content=\"{base}/img/{src}/{j}.jpg\">"
+           "<script>var x = 1;</script><style>p{margin:0}</style></head><body>"
+           "<nav><a href=\"/\">Главная</a> <a href=\"/news\">Новости</a></nav>"
+           f"<article><h1>Новость {src}-{j}</h1><img src=\"/img/{src}/{j}-inline.jpg\">{''.join(paras)}</article>"
+           "<footer>© farm</footer></body></html>")
+    return doc.encode("utf-8")
+
+
+def _handler(src: int, p: FarmParams):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if p.latency_ms:
+                time.sleep(p.latency_ms / 1000.0)
+            base = f"http://{self.headers.get('Host')}"
+            parts = self.path.strip("/").split("/")
+            if parts[0] == "feed":
+                body, ctype = make_feed(src, p, base), "application/rss+xml; charset=utf-8"
+            elif parts[0] == "article" and len(parts) == 3:
+                body, ctype = make_article(src, int(parts[2]), p, base), "text/html; charset=utf-8"
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+            if p.etag and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            if p.etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _serve(params: dict, ready) -> None:
+    p = FarmParams(**params)
+    ports = []
+    for src in range(p.sources):
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), _handler(src, p))
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        ports.append(srv.server_address[1])
+    ready.put(ports)
+    threading.Event().wait()
+
+
+def start_farm(p: FarmParams) -> Tuple[mp.Process, List[str]]:
+    """Запускает ферму в отдельном процессе (чтобы не искажать пиковую память) и возвращает URL лент."""
+    ready: mp.Queue = mp.Queue()
+    proc = mp.Process(target=_serve, args=(asdict(p), ready), daemon=True)
+    proc.start()
+    ports = ready.get(timeout=30)
+    return proc, [f"http://127.0.0.1:{port}/feed/{i}" for i, port in enumerate(ports)]
@@ -0,0 +1,124 @@
+# aggregator/bench/fullgrab_bench.py
+"""
+CPU-бенчмарк fullgrab.grab() на офлайн-корпусе статей.
+
+    python aggregator/bench/fullgrab_bench.py --dump /tmp/grab-old.json
+    python aggregator/bench/fullgrab_bench.py --check /tmp/grab-old.json
+
+Корпус: записанные фикстуры (INGEST_FIXTURES, только text/html) плюс синтетические
+страницы, собранные из заголовков/анонсов frontend/data/news.json в разметку,
+похожую на настоящие сайты (meta og/twitter, скрипты, навигация, сайдбар,
+часть страниц без og:image и с «пустой» статьёй — чтобы сработали фолбэки).
+Страницы отдаются через FixtureAdapter без задержки, поэтому время — это
+разбор и извлечение. --dump/--check сравнивают результат извлечения между коммитами.
+"""
+from __future__ import annotations
+
+import argparse
+import html as html_lib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+AGG_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(AGG_DIR.parent))
+
+from aggregator.pipeline import fullgrab  # noqa: E402
+from aggregator.pipeline.replay import install  # noqa: E402
+
+NEWS_JSON = AGG_DIR.parent / "frontend" / "data" / "news.json"
+HOSTS = ("grozovy.ru", "www.zr.ru", "gruzovoy.ru", "truckmix.ru", "www.globaltrailermag.com")
+
+
+def synth_page(i: int, it: Dict) -> str:
+    title = html_lib.escape(it.get("title") or "")
+    body = it.get("summary") or f"<p>{title}</p>"
+    og = f'<meta property="og:image" content="{html_lib.escape(it.get("image") or "")}">' if it.get("image") and i % 3 else ""
+    tw = '<meta name="twitter:image" content="/img/tw.png">' if i % 4 == 0 else ""
+    nav = "".join(f'<li><a href="/r/{k}">Рубрика {k}</a></li>' for k in range(25))
+    side = "".join(f'<li><a href="/n/{i}-{k}">Похожая новость {k}</a></li>' for k in range(15))
+    if i % 7 == 0:
+        # почти пустая статья — trafilatura ничего не вернёт, сработает селектор
+        article = f'<div class="post-content"><img data-src="/img/{i}.webp"><p>{title}</p></div>'
+    else:
+        article = (f'<article class="article"><h1>{title}</h1><img src="/img/{i}.jpg" srcset="/img/{i}@2x.jpg 2x">'
+                   f'{body}<p>{body}</p><!-- реклама --><p>{title}. {title}.</p></article>')
+    return (f"<!doctype html><html lang=ru><head><meta charset=utf-8><title>{title}</title>{og}{tw}"
+            '<link rel="stylesheet" href="/s.css"><script>window.dataLayer=[];function g(){}</script>'
+            "<style>.a{color:red}</style></head><body>"
+            f'<header><nav><ul>{nav}</ul></nav></header><main>{article}<aside><ul>{side}</ul></aside></main>'
+            "<footer><p>© 2026</p><script>g()</script><noscript>включите JS</noscript></footer></body></html>")
+
+
+def build_corpus(limit: int) -> List[Tuple[str, str]]:
+    pages: List[Tuple[str, str]] = []
+    fx = os.environ.get("INGEST_FIXTURES")
+    if fx and Path(fx).exists():
+        for meta_path in sorted(Path(fx).glob("*/*.json")):
+            meta = json.loads(meta_path.read_text("utf-8"))
+            ctype = str((meta.get("headers") or {}).get("Content-Type") or "")
+            if meta.get("status") == 200 and "html" in ctype:
+                body = meta_path.with_suffix(".body").read_bytes().decode("utf-8", "replace")
+                pages.append((meta["url"], body))
+    items = json.loads(NEWS_JSON.read_text("utf-8"))
+    for i, it in enumerate(items[: max(0, limit - len(pages))]):
+        pages.append((f"https://{HOSTS[i % len(HOSTS)]}/news/{i}/", synth_page(i, it)))
+    return pages[:limit]
+
+
+def write_fixtures(pages: List[Tuple[str, str]], root: Path) -> None:
+    # тот же формат, что пишет FixtureAdapter в режиме record
+    from aggregator.pipeline.replay import fixture_key
+    for url, body in pages:
+        host = url.split("/")[2].replace(":", "_")
+        base = root / host / fixture_key("GET", url)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        base.with_suffix(".body").write_bytes(body.encode("utf-8"))
+        meta = {"method": "GET", "url": url, "status": 200, "reason": "OK",
+                "headers": {"Content-Type": "text/html; charset=utf-8"}}
+        base.with_suffix(".json").write_text(json.dumps(meta, ensure_ascii=False), "utf-8")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="fullgrab.grab() CPU benchmark")
+    ap.add_argument("--limit", type=int, default=600, help="сколько страниц в корпусе")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--dump", type=Path, help="сохранить результаты извлечения")
+    ap.add_argument("--check", type=Path, help="сверить результаты с ранее сохранёнными")
+    ap.add_argument("--processes", type=int, default=0,
+                    help="пул процессов для извлечения (по умолчанию 0: CPU считается в текущем потоке)")
+    args = ap.parse_args()
+    fullgrab.PROCESSES = args.processes
+
+    pages = build_corpus(args.limit)
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="grab-bench-") as tmp:
+        write_fixtures(pages, Path(tmp))
+        install(fullgrab.HTTP, "replay", tmp)
+        cpu = 0.0
+        for _ in range(args.repeat):
+            for url, _body in pages:
+                t0 = time.thread_time()
+                res = fullgrab.grab(url)
+                cpu += time.thread_time() - t0
+                results[url] = {"html": res.html, "lead_image": res.lead_image} if res else None
+
+    n = len(pages) * args.repeat
+    print(f"[BENCH] grab: {len(pages)} pages x{args.repeat}, cpu {cpu:.3f}s, {1000 * cpu / max(1, n):.2f} ms/article")
+    if args.dump:
+        args.dump.write_text(json.dumps(results, ensure_ascii=False, indent=1), "utf-8")
+        print(f"[BENCH] dumped -> {args.dump}")
+    if args.check:
+        ref = json.loads(args.check.read_text("utf-8"))
+        diff = [u for u in ref if ref[u] != results.get(u)]
+        print(f"[BENCH] check vs {args.check.name}: {len(ref) - len(diff)}/{len(ref)} identical")
+        for u in diff[:5]:
+            print(f"  differs: {u}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# aggregator/bench/image_bench.py
+"""
+Поиск картинки в HTML записи ленты: connectors/rss._first_image_from_html
+против прежней версии на BeautifulSoup.
+
+    python aggregator/bench/image_bench.py --repeat 5
+
+Корпус: анонсы (summary) из frontend/data/news.json и их варианты
+с og/twitter-мета, srcset, data-src/data-lazy-src, комментариями и скриптами.
+Прежняя версия возвращала src как есть — для сверки результат достраивается
+от ссылки на запись тем же urljoin.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup  # type: ignore
+
+AGG_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(AGG_DIR.parent))
+
+from aggregator.connectors.rss import _first_image_from_html  # noqa: E402
+
+NEWS_JSON = AGG_DIR.parent / "frontend" / "data" / "news.json"
+
+
+def bs_first_image(html: str, base_url: str) -> Optional[str]:
+    """Прежняя реализация (BeautifulSoup на каждую запись)."""
+    soup = BeautifulSoup(html, "lxml")
+    for tag, attrs in [("meta", {"property": "og:image"}), ("meta", {"name": "twitter:image"}), ("link", {"rel": "image_src"})]:
+        el = soup.find(tag, attrs=attrs)
+        if el:
+            src = el.get("content") or el.get("href")
+            if src:
+                return src
+    img = soup.find("img")
+    if img:
+        src = img.get("src") or img.get("data-src") or img.get("data-original") or img.get("data-lazy-src")
+        if not src and img.get("srcset"):
+            src = img.get("srcset").split(",")[0].split()[0]
+        return src
+    return None
+
+
+def variants(i: int, summary: str) -> List[str]:
+    return [
+        summary,
+        f'<!-- <img src="/ad.gif"> --><p>Анонс {i}</p><img data-lazy-src="/lazy/{i}.jpg" src="">',
+        f"<p>Текст</p><img srcset='/s/{i}-320.jpg 320w, /s/{i}-640.jpg 640w' alt=\"a > b\">",
+        f'<script>var s = "<img src=/x.png>";</script><IMG DATA-SRC="/up/{i}.webp?w=1&amp;h=2">',
+        f'<img src="/first/{i}.jpg"><meta name="twitter:image" content="https://cdn.example.com/tw/{i}.jpg">',
+        f"Обычный текст анонса без разметки номер {i}",
+    ]
+
+
+def build_corpus() -> List[Tuple[str, str]]:
+    items = json.loads(NEWS_JSON.read_text("utf-8"))
+    out = []
+    for i, it in enumerate(items):
+        for html in variants(i, it.get("summary") or ""):
+            out.append((html, it.get("link") or ""))
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="RSS image locator benchmark")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    corpus = build_corpus()
+    timings = {}
+    results = {}
+    for name, fn in (("bs4", bs_first_image), ("regex", _first_image_from_html)):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            res = [fn(html, link) for html, link in corpus]
+        timings[name] = time.perf_counter() - t0
+        results[name] = res
+
+    old = [urljoin(link, src.strip()) if src and link else src for src, (_, link) in zip(results["bs4"], corpus)]
+    diff = [k for k, (a, b) in enumerate(zip(old, results["regex"])) if a != b]
+    n = len(corpus) * args.repeat
+    for name, t in timings.items():
+        print(f"[BENCH] {name:5}: {t:.3f}s, {1e6 * t / n:.1f} us/entry")
+    print(f"[BENCH] x{timings['bs4'] / timings['regex']:.1f}, {len(corpus) - len(diff)}/{len(corpus)} identical")
+    for k in diff[:5]:
+        print(f"  differs: {corpus[k][0][:120]!r}: {old[k]!r} vs {results['regex'][k]!r}")
+
+
+if __name__ == "__main__":
+    main()
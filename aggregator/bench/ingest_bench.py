@@ -0,0 +1,139 @@
+# aggregator/bench/ingest_bench.py
+"""
+Сквозной бенчмарк ингеста на синтетической ферме лент.
+
+    python aggregator/bench/ingest_bench.py --sources 50 --entries 40 --latency-ms 80
+    python aggregator/bench/ingest_bench.py --compare aggregator/bench/results/<старый>.json
+
+Прогоняет main.run() (read -> collect -> dedup -> sort/merge -> save) дважды:
+  cold — пустой архив и пустое состояние (первый прогон),
+  warm — тот же архив, всё известно, условные GET (типичный прогон по cron).
+Пишет JSON с wall time, пиковым RSS и временем по стадиям, чтобы сравнивать коммиты.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+AGG_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(AGG_DIR))
+
+import main as agg  # noqa: E402
+from bench.feedfarm import FarmParams, start_farm  # noqa: E402
+from pipeline.filtering import Prefilter, load_exclude  # noqa: E402
+from pipeline.instrument import Stages  # noqa: E402
+from pipeline.schedule import PollSchedule  # noqa: E402
+
+RESULTS_DIR = AGG_DIR / "bench" / "results"
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss в Linux — килобайты
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=AGG_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def isolate_state(data_dir: Path) -> None:
+    """Все файлы агрегатора — во временный каталог, чтобы не трогать frontend/data."""
+    agg.open_state(data_dir)
+    agg.PREFILTER = Prefilter(load_exclude())
+    # нулевой интервал: в тёплом прогоне все ленты «пора опрашивать», работают условные GET
+    agg.SCHEDULE = PollSchedule(data_dir / "poll_schedule.json", floor=0, ceiling=0, slack=0)
+    agg.STAGES = Stages(enabled=True)
+
+
+def run_once(sources: List[Dict[str, Any]], workers: int, data_dir: Path) -> Dict[str, Any]:
+    # состояние перечитываем с диска, как новый процесс по cron
+    isolate_state(data_dir)
+    agg.WORKERS = workers
+    t0 = time.perf_counter()
+    merged = agg.run(sources)
+    wall = time.perf_counter() - t0
+    stages = agg.STAGES.to_dict()
+    return {
+        "wall": round(wall, 4),
+        "stages": {k: v["wall"] for k, v in stages.items()},
+        "detail": stages,
+        "fresh": stages.get("collect", {}).get("items", 0),
+        "total": len(merged),
+        "bytes": stages.get("save", {}).get("bytes", 0),
+        "feeds": dict(agg.FEEDS.stats),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(cur: Dict[str, Any], old_path: Path) -> None:
+    old = json.loads(old_path.read_text("utf-8"))
+    print(f"\ncompare with {old_path.name} ({old.get('commit')}):")
+    for phase in ("cold", "warm"):
+        a, b = old["runs"].get(phase) or {}, cur["runs"].get(phase) or {}
+        for key in ["wall"] + [f"stages.{s}" for s in (b.get("stages") or {})]:
+            get = lambda r: r.get("stages", {}).get(key[7:]) if key.startswith("stages.") else r.get(key)
+            va, vb = get(a), get(b)
+            if va and vb:
+                print(f"  {phase:4} {key:16} {va:8.3f}s -> {vb:8.3f}s  x{va / vb:5.2f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="ingest benchmark on a synthetic feed farm")
+    ap.add_argument("--sources", type=int, default=20)
+    ap.add_argument("--entries", type=int, default=30)
+    ap.add_argument("--summary-bytes", type=int, default=400)
+    ap.add_argument("--article-bytes", type=int, default=8000)
+    ap.add_argument("--latency-ms", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=agg.WORKERS)
+    ap.add_argument("--no-etag", action="store_true", help="ферма не отдаёт ETag/304")
+    ap.add_argument("--out", type=Path, default=None, help="куда записать JSON с результатом")
+    ap.add_argument("--compare", type=Path, default=None, help="JSON прошлого прогона для сравнения")
+    args = ap.parse_args()
+
+    params = FarmParams(sources=args.sources, entries=args.entries, summary_bytes=args.summary_bytes,
+                        article_bytes=args.article_bytes, latency_ms=args.latency_ms, etag=not args.no_etag)
+    proc, urls = start_farm(params)
+    sources = [{"name": f"farm-{i}", "url": u} for i, u in enumerate(urls)]
+    try:
+        with tempfile.TemporaryDirectory(prefix="ingest-bench-") as tmp:
+            runs = {"cold": run_once(sources, args.workers, Path(tmp)),
+                    "warm": run_once(sources, args.workers, Path(tmp))}
+    finally:
+        proc.terminate()
+
+    result = {
+        "bench": "ingest",
+        "commit": git_rev(),
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {**asdict(params), "workers": args.workers},
+        "runs": runs,
+    }
+    out = args.out or RESULTS_DIR / f"ingest-{result['commit']}-{int(time.time())}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), "utf-8")
+
+    for phase, r in runs.items():
+        st = " ".join(f"{k}={v:.3f}" for k, v in r["stages"].items())
+        print(f"[BENCH] {phase}: wall {r['wall']:.3f}s | {st} | fresh {r['fresh']} total {r['total']} "
+              f"| peak rss {r['peak_rss_mb']} MB")
+    print(f"[BENCH] saved -> {out}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
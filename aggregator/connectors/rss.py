@@ -1,48 +1,31 @@
 # aggregator/connectors/rss.py
 from __future__ import annotations
 
+import html as html_lib
+import os
+import re
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Tuple
-from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.parse import urljoin
 
 import feedparser  # type: ignore
-import requests    # type: ignore
-from bs4 import BeautifulSoup  # type: ignore
 from slugify import slugify    # type: ignore
 
-from aggregator.pipeline.fullgrab import grab  # <-- важно
+from aggregator.pipeline.canon import canonical_url
+from aggregator.pipeline.filtering import Prefilter, load_exclude
+from aggregator.pipeline.fullgrab import GRAB_CACHE, HTTP, IMAGE_STATS, grab_cached, grab_image_cached  # <-- важно
+from aggregator.pipeline.gazetteer import default_gazetteer
+from aggregator.pipeline.ordered import ordered_map
 
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-DEFAULT_PORTS = {"http": "80", "https": "443"}
-TRACK_PARAMS_PREFIXES = ("utm_", "ga_", "gclid", "yclid", "fbclid", "mc_cid", "mc_eid", "ref", "ref_src")
+GRAB_WORKERS = int(os.environ.get("GRAB_WORKERS") or 4)   # параллельных скачиваний статей
+GRAB_WINDOW = int(os.environ.get("GRAB_WINDOW") or 32)    # записей в работе на одну ленту
+# exclude: из rules.yml — по полям ленты, до скачивания страниц статей
+PREFILTER = Prefilter(load_exclude())
 
 def _normalize_url(raw: str) -> str:
-    """Обрезаем трекинг, дефолтные порты, конечный слэш; задаём https по умолчанию."""
-    if not raw:
-        return ""
-    parts = urlsplit(raw)
-    scheme = (parts.scheme or "https").lower()
-    netloc = (parts.netloc or "").lower()
-
-    # Убираем default ports
-    if ":" in netloc:
-        host, port = netloc.split(":", 1)
-        if port == DEFAULT_PORTS.get(scheme):
-            netloc = host
-
-    # Чистим трекинг
-    q = []
-    for k, v in parse_qsl(parts.query, keep_blank_values=True):
-        if any(k.lower().startswith(pref) for pref in TRACK_PARAMS_PREFIXES):
-            continue
-        q.append((k, v))
-    query = urlencode(q, doseq=True)
-
-    path = parts.path or "/"
-    if path.endswith("/") and path != "/":
-        path = path[:-1]
-
-    return urlunsplit((scheme, netloc, path, query, ""))
+    """Обрезаем трекинг, дефолтные порты, конечный слэш (общий канонизатор pipeline/canon.py)."""
+    return canonical_url(raw)
 
 def _rss_content_encoded(entry: Any) -> str | None:
     # feedparser может класть <content:encoded> по-разному
@@ -64,79 +47,163 @@ def _summary_text(entry: Any) -> str:
     s = entry.get("summary") or entry.get("description") or ""
     return s
 
+# кавычки открывают значение только после «=», как у HTML-токенизатора (alt=""" бывает в живых лентах)
+_TAG_RE = re.compile(r"""<(img|meta|link)\b((?:=\s*"[^"]*"|=\s*'[^']*'|[^>])*+)>""", re.I)
+_ATTR_RE = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?""")
+_META_HINT_RE = re.compile(r"<(?:meta|link)\b", re.I)
+_SKIP_HINT_RE = re.compile(r"<(?:!--|script|style)", re.I)
+_SKIP_RE = re.compile(r"<!--.*?-->|<(script|style)\b.*?</\1\s*>", re.I | re.S)
+
+def _attrs(raw: str) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for m in _ATTR_RE.finditer(raw):
+        name = m.group(1).lower()
+        if name not in out:  # как у парсера: повторный атрибут не перекрывает первый
+            val = m.group(2) if m.group(2) is not None else m.group(3) if m.group(3) is not None else m.group(4)
+            out[name] = html_lib.unescape(val) if val and "&" in val else (val or "")
+    return out
+
 def _first_image_from_html(html: str, base_url: str) -> str | None:
-    soup = BeautifulSoup(html, "lxml")
-    # meta og/twitter
-    for tag, attrs in [("meta", {"property": "og:image"}), ("meta", {"name": "twitter:image"}), ("link", {"rel": "image_src"})]:
-        el = soup.find(tag, attrs=attrs)
-        if el:
-            src = el.get("content") or el.get("href")
-            if src:
-                return src
-    # первый <img> с учётом srcset/data-src
-    img = soup.find("img")
-    if img:
-        src = img.get("src") or img.get("data-src") or img.get("data-original") or img.get("data-lazy-src")
-        if not src and img.get("srcset"):
-            src = img.get("srcset").split(",")[0].split()[0]
-        return src
-    return None
+    """
+    Картинка из HTML записи ленты без построения дерева: og:image >
+    twitter:image > link rel=image_src > первый <img> (src, data-src,
+    data-original, data-lazy-src, первый URL из srcset). Теги ищем регуляркой
+    и останавливаемся на первом подходящем; текст без разметки отсекается сразу.
+    Относительный URL достраивается от ссылки на запись.
+    """
+    if not html or "<" not in html:
+        return None
+    if _SKIP_HINT_RE.search(html):
+        html = _SKIP_RE.sub("", html)
+
+    src = None
+    if _META_HINT_RE.search(html):
+        # мета-теги приоритетнее <img>, где бы они ни стояли; берём первый тег каждого вида
+        found: Dict[str, str] = {}
+        for m in _TAG_RE.finditer(html):
+            tag = m.group(1).lower()
+            if tag == "img":
+                continue
+            a = _attrs(m.group(2))
+            if tag == "meta" and a.get("property") == "og:image":
+                key = "og"
+            elif tag == "meta" and a.get("name") == "twitter:image":
+                key = "twitter"
+            elif tag == "link" and "image_src" in a.get("rel", "").split():
+                key = "link"
+            else:
+                continue
+            if key not in found:
+                found[key] = a.get("content") or a.get("href") or ""
+                if key == "og" and found[key]:
+                    break
+        src = found.get("og") or found.get("twitter") or found.get("link")
+    if not src:
+        for m in _TAG_RE.finditer(html):
+            if m.group(1).lower() != "img":
+                continue
+            a = _attrs(m.group(2))
+            src = a.get("src") or a.get("data-src") or a.get("data-original") or a.get("data-lazy-src")
+            if not src and a.get("srcset"):
+                src = a["srcset"].split(",")[0].split()[0]
+            break  # только первый <img>, как раньше
+    if not src:
+        return None
+    src = src.strip()
+    return urljoin(base_url, src) if base_url else src
+
+def _parse_entry(name: str, url: str, raw: Any) -> Dict[str, Any] | None:
+    """Стадия 1 (в потоке ленты): поля записи и решение, нужна ли страница статьи."""
+    try:
+        link = _normalize_url(raw.get("link", ""))
+
+        # Базовые поля
+        title = (raw.get("title") or "").strip()
+        published = raw.get("published_parsed") or raw.get("updated_parsed") or None
+        dt = datetime(*published[:6], tzinfo=timezone.utc).isoformat() if published else None
+        guid = raw.get("id") or raw.get("guid") or link or title
+        slug = slugify(f"{name}-{guid}")[:80]
+
+        # HTML из RSS: content:encoded > summary
+        html_from_rss = _rss_content_encoded(raw) or _summary_text(raw)
+        prefer_full = isinstance(html_from_rss, str) and len(html_from_rss) > 500 and "<p" in html_from_rss.lower()
+
+        # Попытка получить сразу картинку из RSS-HTML (быстрее)
+        img_from_rss = _first_image_from_html(html_from_rss or "", link)
+
+        item: Dict[str, Any] = {
+            "source": name,
+            "slug": slug,
+            "title": title,
+            "link": link,
+            "published_at": dt,
+            "content_html": html_from_rss or "",
+        }
+        if img_from_rss:
+            item["image"] = img_from_rss
+        # full — нет «полного» контента, идём на страницу; image — только за картинкой
+        grab_mode = "full" if not prefer_full else ("image" if not img_from_rss else None)
+        if PREFILTER.entry_reason(link, title, _summary_text(raw), requests=1 if grab_mode else 0):
+            return None
+        return {"url": url, "item": item, "grab": grab_mode}
+    except Exception as ex:
+        print(f"[ERROR] RSS entry fail in {url}: {ex}")
+        return None
+
+def _grab_entry(job: Dict[str, Any] | None) -> Dict[str, Any] | None:
+    """Стадия 2 (в пуле): страница статьи, если она нужна."""
+    if job is None:
+        return None
+    item, mode = job["item"], job["grab"]
+    if not mode:
+        return item
+    try:
+        if mode == "full":
+            grabbed = grab_cached(item["link"])
+            if grabbed and grabbed.html:
+                item["content_html"] = grabbed.html
+            if grabbed and grabbed.lead_image:
+                item["image"] = grabbed.lead_image
+        else:
+            # текст уже есть — со страницы нужна только картинка (читаем до </head>)
+            image = grab_image_cached(item["link"])
+            if image:
+                item["image"] = image
+        return item
+    except Exception as ex:
+        print(f"[ERROR] RSS entry fail in {job['url']}: {ex}")
+        return None
 
-def fetch_rss(name: str, url: str) -> List[Dict[str, Any]]:
+def fetch_rss(name: str, url: str, workers: int | None = None) -> List[Dict[str, Any]]:
     """
     Скачиваем RSS/Atom, нормализуем поля, вытаскиваем полноценный контент:
       - если в RSS есть content:encoded и он «длинный» — используем его
-      - иначе идём на страницу статей (fullgrab.grab)
+      - иначе идём на страницу статей (fullgrab.grab, через кэш статей)
+    Записи, попавшие под exclude: из rules.yml (домен, слова в title/summary),
+    отсекаются до любых запросов к страницам — см. PREFILTER.
+    Записи разбираются по мере чтения ленты и уходят в пул GRAB_WORKERS потоков
+    (не больше GRAB_PER_HOST запросов на хост — см. fullgrab). В работе держим
+    не больше GRAB_WINDOW записей, результат — в порядке ленты.
+    Теги (производители, типы техники) ставятся по gazetteer.yml.
     """
+    if PREFILTER.feed_blocked(url):
+        print(f"[INFO] RSS skipped: {name} (blocked domain)")
+        return []
     headers = {"User-Agent": USER_AGENT}
-    d = feedparser.parse(requests.get(url, headers=headers, timeout=20).content)
+    d = feedparser.parse(HTTP.get(url, headers=headers, timeout=20).content)
 
+    jobs = (_parse_entry(name, url, raw) for raw in d.entries)
     items: List[Dict[str, Any]] = []
-    for raw in d.entries:
-        try:
-            link = _normalize_url(raw.get("link", ""))
-
-            # Базовые поля
-            title = (raw.get("title") or "").strip()
-            published = raw.get("published_parsed") or raw.get("updated_parsed") or None
-            dt = datetime(*published[:6], tzinfo=timezone.utc).isoformat() if published else None
-            guid = raw.get("id") or raw.get("guid") or link or title
-            slug = slugify(f"{name}-{guid}")[:80]
-
-            # HTML из RSS: content:encoded > summary
-            html_from_rss = _rss_content_encoded(raw) or _summary_text(raw)
-            prefer_full = isinstance(html_from_rss, str) and len(html_from_rss) > 500 and "<p" in html_from_rss.lower()
-
-            # Попытка получить сразу картинку из RSS-HTML (быстрее)
-            img_from_rss = _first_image_from_html(html_from_rss or "", link)
-
-            # Если нет «полного» контента — идём на страницу
-            if not prefer_full:
-                grabbed = grab(link)
-                content_html = (grabbed.html if grabbed else None) or html_from_rss or ""
-                image = (grabbed.lead_image if grabbed else None) or img_from_rss
-            else:
-                content_html = html_from_rss or ""
-                image = img_from_rss
-                # если картинка не нашлась — всё равно пробуем страницу (только за картинкой)
-                if not image:
-                    grabbed = grab(link)
-                    image = grabbed.lead_image if grabbed else None
-
-            item: Dict[str, Any] = {
-                "source": name,
-                "slug": slug,
-                "title": title,
-                "link": link,
-                "published_at": dt,
-                "content_html": content_html,
-            }
-            if image:
-                item["image"] = image
-
+    for item in ordered_map(_grab_entry, jobs, workers=workers or GRAB_WORKERS, window=GRAB_WINDOW):
+        if item is not None:
             items.append(item)
-        except Exception as ex:
-            print(f"[ERROR] RSS entry fail in {url}: {ex}")
+    default_gazetteer().tag_items(items)
 
     print(f"[INFO] RSS parsed: {len(items)} items from {name}")
+    print(f"[INFO] pre-fetch filter: {PREFILTER.summary()}")
+    if GRAB_CACHE is not None:
+        print(f"[INFO] grab cache: {GRAB_CACHE.summary()}")
+    if IMAGE_STATS["pages"]:
+        print(f"[INFO] image-only grabs: {IMAGE_STATS['pages']} pages, {IMAGE_STATS['bytes']} bytes read, "
+              f"stopped early: {IMAGE_STATS['stopped_early']}")
     return items
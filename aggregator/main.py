@@ -1,24 +1,104 @@
 # aggregator/main.py
 from __future__ import annotations
-import json, sys, time
+import argparse, calendar, json, os, sys, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import requests, feedparser, yaml  # pip install requests feedparser pyyaml
+from requests.adapters import HTTPAdapter
+
+from pipeline import clock
+from pipeline.bloom import SeenFilter
+from pipeline.canon import UrlIndex, item_key
+from pipeline.dedupe import assign_stories, drop_near_duplicates, seed_near_index
+from pipeline.export import pretty_from_env, read_meta, save_news
+from pipeline.feedcache import FeedCache
+from pipeline.filtering import Prefilter, load_exclude
+from pipeline.gazetteer import default_gazetteer
+from pipeline.health import SourceHealth, backoff_delay
+from pipeline.hostlimit import HostLimiter
+from pipeline.instrument import Stages, profile_run
+from pipeline.known import KnownIndex
+from pipeline.merge import epoch_of, merge_sorted, parse_ts, stamp
+from pipeline.minhash import NearDupIndex
+from pipeline.replay import install_from_env, summary as replay_summary
+from pipeline.schedule import PollSchedule
 
 VER = "safe-collector v2.1"
 
 ROOT = Path(__file__).resolve().parents[1]
-DATA_DIR = ROOT / "frontend" / "data"
-NEWS_JSON = DATA_DIR / "news.json"
-META_JSON = DATA_DIR / "news_meta.json"
+# все файлы состояния лежат в одном каталоге (см. open_state): --data-dir / INGEST_DATA_DIR
+DATA_DIR = Path(os.environ.get("INGEST_DATA_DIR") or ROOT / "frontend" / "data")
 CFG_PATH = ROOT / "aggregator" / "sources.yml"
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+# Параллельный сбор: INGEST_WORKERS=1 — старый последовательный режим
+WORKERS = _env_int("INGEST_WORKERS", 8)
+PER_HOST = _env_int("INGEST_PER_HOST", 2)
+# Повторы внутри прогона и circuit breaker между прогонами
+RETRIES = _env_int("INGEST_RETRIES", 2)
+BREAKER_AFTER = _env_int("INGEST_BREAKER_AFTER", 3)
+BREAKER_COOLDOWN_H = _env_int("INGEST_BREAKER_COOLDOWN_H", 6)
+# Адаптивный опрос: не чаще FLOOR и не реже CEIL часов
+POLL_FLOOR_H = _env_int("INGEST_POLL_FLOOR_H", 3)
+POLL_CEIL_H = _env_int("INGEST_POLL_CEIL_H", 48)
+# Почти-дубли между источниками: порог сходства MinHash и окно индекса
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD") or 0.6)
+NEAR_DUP_WINDOW_D = _env_int("NEAR_DUP_WINDOW_D", 14)
+# Сюжеты: с какого сходства запись присоединяется к чужому сюжету
+STORY_THRESHOLD = float(os.environ.get("STORY_THRESHOLD") or 0.4)
+# Всё когда-либо собранное (и вне 5000 записей архива): доля ложных срабатываний
+SEEN_FP = float(os.environ.get("SEEN_FP") or 1e-4)
+
 UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
       "AppleWebKit/537.36 (KHTML, like Gecko) "
       "Chrome/124.0 Safari/537.36")
 HTTP = requests.Session()
 HTTP.headers.update({"User-Agent": UA, "Accept": "*/*"})
+# пул соединений под число воркеров, чтобы потоки не ждали свободный сокет
+_ADAPTER = HTTPAdapter(pool_connections=max(10, WORKERS), pool_maxsize=max(10, WORKERS))
+HTTP.mount("http://", _ADAPTER)
+HTTP.mount("https://", _ADAPTER)
+# INGEST_HTTP_MODE=record|replay — офлайн-фикстуры вместо сети (см. pipeline/replay.py)
+FIXTURES = install_from_env(HTTP, pool_size=max(10, WORKERS))
+HOSTS = HostLimiter(PER_HOST)
+# exclude: из rules.yml — до скачивания лент и normalize(), а не после
+PREFILTER = Prefilter(load_exclude())
+
+def open_state(data_dir: Path) -> None:
+    """
+    Архив и все файлы состояния между прогонами — из data_dir. По умолчанию
+    frontend/data; replay и бенчмарк работают в своём каталоге и не трогают его.
+    """
+    global DATA_DIR, NEWS_JSON, META_JSON, FEEDS, KNOWN, SEEN, URLS, NEAR, HEALTH, SCHEDULE
+    DATA_DIR = Path(data_dir)
+    NEWS_JSON = DATA_DIR / "news.json"
+    META_JSON = DATA_DIR / "news_meta.json"
+    FEEDS = FeedCache(DATA_DIR / "feed_cache.json")
+    KNOWN = KnownIndex(DATA_DIR / "known_index.json")
+    SEEN = SeenFilter(DATA_DIR / "seen.bloom", error=SEEN_FP)
+    # ключ URL -> id/first_seen, общий с post_to_telegram.py и дайджестом
+    URLS = UrlIndex(DATA_DIR / "url_index.json")
+    NEAR = NearDupIndex(DATA_DIR / "near_dup_index.json", threshold=NEAR_DUP_THRESHOLD,
+                        window=NEAR_DUP_WINDOW_D * 86400)
+    HEALTH = SourceHealth(DATA_DIR / "source_health.json", threshold=BREAKER_AFTER,
+                          cooldown=BREAKER_COOLDOWN_H * 3600)
+    SCHEDULE = PollSchedule(DATA_DIR / "poll_schedule.json", floor=POLL_FLOOR_H * 3600,
+                            ceiling=POLL_CEIL_H * 3600)
+
+open_state(DATA_DIR)
+# теги записей (производители, типы техники) по справочнику; GAZETTEER — другой файл
+GAZETTEER = default_gazetteer()
+# INGEST_STAGES=1 / --stages — таблица времени по стадиям в конце прогона
+STAGES = Stages(enabled=os.environ.get("INGEST_STAGES") == "1")
+NOT_MODIFIED = object()  # лента не менялась с прошлого прогона
 
 def log(k: str, msg: str) -> None:
     print(f"[{k}] {msg}")
@@ -27,12 +107,49 @@ def load_cfg() -> Dict[str, Any]:
     with CFG_PATH.open("r", encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
 
-def fetch_rss(url: str):
+def _transient(e: Exception) -> bool:
+    if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return False
+
+def _get_feed(url: str) -> requests.Response:
+    """GET с ограниченными повторами (джиттер, экспонента) только на временных ошибках."""
+    for attempt in range(RETRIES + 1):
+        try:
+            with HOSTS.slot(url):
+                r = HTTP.get(url, timeout=(10, 20), headers=FEEDS.request_headers(url))
+            if r.status_code == 429 or r.status_code >= 500:
+                r.raise_for_status()
+            return r
+        except requests.RequestException as e:
+            if attempt >= RETRIES or not _transient(e):
+                raise
+            delay = backoff_delay(attempt, 1.0, 10.0)
+            log("RETRY", f"{url}: {e.__class__.__name__}, attempt {attempt + 2} in {delay:.1f}s")
+            time.sleep(delay)
+    raise RuntimeError("unreachable")
+
+def fetch_rss(url: str, name: str = ""):
     try:
-        r = HTTP.get(url, timeout=(10, 20))
+        with STAGES.timed("net") as st:
+            r = _get_feed(url)
+            st["bytes"] = len(r.content or b"")
+        if r.status_code == 304:
+            HEALTH.success(url, name)
+            FEEDS.not_modified(url)
+            return NOT_MODIFIED
         r.raise_for_status()
-        return feedparser.parse(r.content)
+        HEALTH.success(url, name)
+        if not FEEDS.changed(url, r.headers, r.content):
+            return NOT_MODIFIED
+        with STAGES.timed("parse") as st:
+            fp = feedparser.parse(r.content)
+            st["items"], st["bytes"] = len(fp.entries), len(r.content)
+        return fp
     except Exception as e:
+        HEALTH.failure(url, name or url, f"{e.__class__.__name__}: {e}")
         log("ERR", f"fetch {url}: {e.__class__.__name__}: {e}")
         return None
 
@@ -83,45 +200,123 @@ def normalize(entry, src_name: str) -> Dict[str, Any]:
         "summary": summary,
         "image": img,
         "published_at": published,
+        "published_ts": parse_ts(published),
         "domain": domain,
     }
 
-def collect(sources_cfg: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    items: List[Dict[str, Any]] = []
-    for src in sources_cfg or []:
-        name = src.get("name") or "source"
-        url = src.get("url") or src.get("link") or ""
-        if not url:
-            log("ERR", f"{name}: empty url")
-            continue
-        fp = fetch_rss(url)
-        entries = []
-        if fp and getattr(fp, "entries", None):
-            entries = list(fp.entries)  # гарантированно список
-        else:
-            log("ERR", f"{name}: entries empty")
-        got = 0
+def entry_stamps(entries) -> List[float]:
+    out = []
+    for e in entries:
+        st = e.get("published_parsed") or e.get("updated_parsed")
+        if st:
+            try:
+                out.append(float(calendar.timegm(st)))
+            except Exception:
+                pass
+    return out
+
+def collect_source(src: Dict[str, Any], force: bool = False) -> Tuple[str, List[Tuple[str, str, Dict[str, Any]]], float]:
+    """
+    Одна лента: (имя, [(guid, link, запись)], время). KNOWN и SEEN здесь только
+    читаются — новые записи запоминает collect() при склейке, в порядке sources.yml.
+    """
+    t0 = time.perf_counter()
+    name = src.get("name") or "source"
+    url = src.get("url") or src.get("link") or ""
+    items: List[Tuple[str, str, Dict[str, Any]]] = []
+    if not url:
+        log("ERR", f"{name}: empty url")
+        return name, items, 0.0
+    if not force and not SCHEDULE.due(url, name):
+        until = datetime.fromtimestamp(SCHEDULE.next_due(url), tz=timezone.utc).isoformat(timespec="minutes")
+        log("SKIP", f"{name}: not due until {until}")
+        return name, items, 0.0
+    if PREFILTER.feed_blocked(url):
+        log("SKIP", f"{name}: blocked domain (rules.yml exclude.domains)")
+        return name, items, 0.0
+    if not HEALTH.allow(url, name):
+        until = datetime.fromtimestamp(HEALTH.open_until(url), tz=timezone.utc).isoformat(timespec="minutes")
+        log("SKIP", f"{name}: circuit open until {until}")
+        return name, items, 0.0
+    fp = fetch_rss(url, name)
+    entries = []
+    if fp is NOT_MODIFIED:
+        SCHEDULE.observe(url, name, [])
+        log("SKIP", f"{name}: not modified")
+    elif fp and getattr(fp, "entries", None):
+        entries = list(fp.entries)  # гарантированно список
+        SCHEDULE.observe(url, name, entry_stamps(entries))
+    else:
+        log("ERR", f"{name}: entries empty")
+    with STAGES.timed("normalize") as st:
         for e in entries:
+            guid, link = e.get("id") or "", e.get("link") or ""
+            if KNOWN.is_known(guid, link):
+                continue  # уже в архиве — не нормализуем повторно
+            if SEEN.seen(guid, link):
+                continue  # собирали раньше, но запись уже выпала из архива
+            if PREFILTER.entry_reason(link, e.get("title") or "", e.get("summary") or ""):
+                continue  # exclude: из rules.yml — дальше (архив, перевод, постинг) не идёт
             try:
-                items.append(normalize(e, name))
-                got += 1
+                items.append((guid, link, normalize(e, name)))
             except Exception as ex:
                 log("ERR", f"{name}: normalize error: {ex}")
-        log("OK", f"{name}: +{got}")
+        st["items"] = len(items)
+    return name, items, time.perf_counter() - t0
+
+def collect(sources_cfg: List[Dict[str, Any]], workers: Optional[int] = None,
+            force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Собирает все источники. При workers > 1 ленты качаются параллельно
+    (не больше PER_HOST запросов на хост), но результат склеивается
+    строго в порядке sources.yml — как при последовательном проходе.
+    force=True опрашивает и те источники, чей срок по расписанию ещё не пришёл.
+    Одна и та же запись (GUID или ссылка) в нескольких лентах достаётся
+    источнику, который раньше в sources.yml, — независимо от того, какой
+    поток скачал ленту первым.
+    """
+    sources = list(sources_cfg or [])
+    workers = WORKERS if workers is None else workers
+    t0 = time.perf_counter()
+    if workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(sources))) as pool:
+            results = list(pool.map(partial(collect_source, force=force), sources))
+    else:
+        results = [collect_source(src, force) for src in sources]
+    wall = time.perf_counter() - t0
+
+    items: List[Dict[str, Any]] = []
+    busy = 0.0
+    for (name, got, took), src in zip(results, sources):
+        if not (src.get("url") or src.get("link")):
+            continue
+        fresh = []
+        for guid, link, item in got:
+            if KNOWN.claim(guid, link):
+                SEEN.remember(guid, link)
+                fresh.append(item)
+        items.extend(fresh)
+        busy += took
+        dups = f", {len(got) - len(fresh)} already taken by earlier sources" if len(fresh) < len(got) else ""
+        log("OK", f"{name}: +{len(fresh)} ({took:.2f}s){dups}")
+    log("TIME", f"collect: {wall:.2f}s wall, {busy:.2f}s sum by sources, workers={max(1, workers)}")
     return items
 
 def read_existing() -> List[Dict[str, Any]]:
+    if not NEWS_JSON.exists():
+        return []
     try:
-        if NEWS_JSON.exists():
-            return json.loads(NEWS_JSON.read_text("utf-8"))
-    except Exception:
-        pass
-    return []
+        data = json.loads(NEWS_JSON.read_text("utf-8"))
+    except Exception as e:
+        # битый архив нельзя молча превращать в [] — иначе следующий save() его затрёт
+        log("ERR", f"{NEWS_JSON} is unreadable: {e.__class__.__name__}: {e}")
+        raise SystemExit(1)
+    return data if isinstance(data, list) else []
 
 def dedup_by_link(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     seen, out = set(), []
     for it in items:
-        key = it.get("link") or it.get("title")
+        key = item_key(it)
         if not key or key in seen:
             continue
         seen.add(key)
@@ -129,21 +324,32 @@ def dedup_by_link(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return out
 
 def sort_by_date(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    def key(it):
-        val = it.get("published_at")
-        try:
-            return datetime.fromisoformat(val.replace("Z","+00:00")) if val else datetime.min.replace(tzinfo=timezone.utc)
-        except Exception:
-            return datetime.min.replace(tzinfo=timezone.utc)
-    return sorted(items, key=key, reverse=True)
-
-def save(items: List[Dict[str, Any]]) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    NEWS_JSON.write_text(json.dumps(items, ensure_ascii=False, indent=2), "utf-8")
-    META_JSON.write_text(
-        json.dumps({"updated_at": datetime.now(timezone.utc).isoformat(), "count": len(items)}, ensure_ascii=False, indent=2),
-        "utf-8",
-    )
+    return sorted(items, key=epoch_of, reverse=True)
+
+def merge_new(fresh: List[Dict[str, Any]], existing: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    То же, что sort_by_date(dedup_by_link(fresh + existing)), но архив не
+    пересортировывается: сортируем только свежие и сливаем за один проход.
+    """
+    with STAGES.stage("dedup") as st:
+        fresh = dedup_by_link(fresh)
+        taken = {item_key(it) for it in fresh}
+        rest = [it for it in dedup_by_link(existing) if item_key(it) not in taken]
+        st["items"] = len(fresh) + len(rest)
+    with STAGES.stage("sort") as st:
+        stamp(fresh)
+        parsed = stamp(rest)
+        merged = merge_sorted(fresh, rest)
+        st["items"] = len(merged)
+    if parsed:
+        log("INFO", f"published_ts backfilled: {parsed}")
+    return merged
+
+def save(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    meta = save_news(items, NEWS_JSON, META_JSON, pretty=pretty_from_env(),
+                     extra={"gazetteer": GAZETTEER.version})
+    log("INFO", f"written {meta['bytes']} bytes, sha256 {meta['sha256'][:12]}")
+    return meta
 
 def stats(items: List[Dict[str, Any]]) -> None:
     from collections import Counter
@@ -154,29 +360,134 @@ def stats(items: List[Dict[str, Any]]) -> None:
     top_domain, top_count = c.most_common(1)[0]
     log("STATS", f"total: {len(items)} | top domains: {top_domain}:{top_count}")
 
-def main() -> None:
-    print("[BOOT] starting aggregator")
-    print(f"[BOOT] version: {VER}")
-    print(f"[BOOT] python: {sys.version.split()[0]}")
-    print(f"[BOOT] cwd  = {ROOT}")
-    cfg = load_cfg()
-    sources = cfg.get("sources") or []
-    print(f"[RUN] sources: {len(sources)}")
-    fresh = collect(sources)
-    log("INFO", f"fresh after aggregate: {len(fresh)}")
-    existing = read_existing()
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="RSS aggregator -> frontend/data/news.json")
+    ap.add_argument("--force-refresh", action="store_true",
+                    default=os.environ.get("INGEST_FORCE_REFRESH") == "1",
+                    help="опросить все источники, игнорируя расписание и валидаторы кэша")
+    ap.add_argument("--stages", action="store_true", default=STAGES.enabled,
+                    help="напечатать время/CPU/объёмы по стадиям (INGEST_STAGES=1)")
+    ap.add_argument("--profile", default=os.environ.get("INGEST_PROFILE") or None,
+                    help="профиль всего прогона: *.prof — cProfile по всем потокам (на Python 3.12+ только "
+                         "главный), *.folded — стеки всех потоков для flamegraph (INGEST_PROFILE)")
+    ap.add_argument("--data-dir", type=Path, default=None,
+                    help="каталог архива и файлов состояния (INGEST_DATA_DIR; по умолчанию frontend/data, "
+                         "в replay — временный)")
+    ap.add_argument("--now", default=os.environ.get("INGEST_NOW") or None,
+                    help="зафиксировать время прогона: секунды эпохи или ISO (INGEST_NOW; в replay — "
+                         "время записи фикстур)")
+    # остальные аргументы (--sources/--output из workflow) принимаем молча, как раньше
+    args, _ = ap.parse_known_args(argv)
+    return args
+
+def run(sources: List[Dict[str, Any]], force_refresh: bool = False) -> List[Dict[str, Any]]:
+    with STAGES.stage("read") as st:
+        existing = read_existing()
+        st["items"] = len(existing)
     log("INFO", f"existing in file: {len(existing)}")
-    merged = dedup_by_link(fresh + existing)
-    merged = sort_by_date(merged)
+    if not existing or force_refresh:
+        # архив пуст (или просили обновить всё) — валидаторам верить нельзя, качаем всё заново
+        FEEDS.clear()
+    if not existing:
+        # без архива «уже собирали» ничего не значит — иначе пустой файл так и останется пустым
+        SEEN.clear()
+    KNOWN.seed(existing)
+    if not SEEN.loaded:
+        log("INFO", f"seen filter seeded: {SEEN.seed(existing, KNOWN.guids)}")
+    if not URLS.loaded:
+        # индекса ещё нет — всё, что уже в архиве, считаем известным и разосланным
+        log("INFO", f"url index seeded: {URLS.seed(existing)}")
+    if not NEAR.loaded:
+        log("INFO", f"near-dup index seeded: {seed_near_index(existing, NEAR, story_threshold=STORY_THRESHOLD)}")
+    with STAGES.stage("collect") as st:
+        fresh = collect(sources, force=force_refresh or not existing)
+        st["items"] = len(fresh)
+    log("INFO", f"fresh after aggregate: {len(fresh)} (known skipped: {KNOWN.skipped})")
+    log("SEEN", SEEN.summary())
+    log("FILTER", PREFILTER.summary(requests=False))
+    log("CACHE", FEEDS.summary())
+    log("HEALTH", HEALTH.summary())
+    log("POLL", SCHEDULE.summary())
+    if FIXTURES is not None:
+        log("HTTP", replay_summary(FIXTURES))
+    with STAGES.stage("near_dup") as st:
+        fresh, dropped = drop_near_duplicates(fresh, NEAR)
+        st["items"] = len(fresh)
+    for it in dropped:
+        log("DUP", f"{it.get('source')}: {(it.get('title') or '')[:80]}")
+    log("INFO", f"near duplicates: {NEAR.summary()}")
+    with STAGES.stage("stories") as st:
+        assign_stories(fresh, NEAR, STORY_THRESHOLD, archive=existing)
+        st["items"] = len(fresh)
+    log("INFO", f"stories: {NEAR.story_summary()}")
+    with STAGES.stage("tags") as st:
+        # архив размечен другой версией справочника (или ещё без него) — размечаем
+        # весь один раз, дальше только свежие; версия лежит в news_meta.json
+        backfill = existing if read_meta(META_JSON).get("gazetteer") != GAZETTEER.version else []
+        tagged = GAZETTEER.tag_items(fresh) + GAZETTEER.tag_items(backfill)
+        st["items"] = len(fresh) + len(backfill)
+    log("INFO", f"tagged: {tagged} of {len(fresh)} fresh + {len(backfill)} backfilled")
+    merged = merge_new(fresh, existing)
     new_count = len(merged) - len(existing)
     log("INFO", f"new items this run: {new_count}")
+    for it in fresh:
+        URLS.add(item_key(it))
+    log("INFO", f"url index: +{URLS.added}, total {len(URLS.items)}")
     if len(merged) > 5000:
+        for it in merged[5000:]:
+            URLS.items.pop(item_key(it), None)
         merged = merged[:5000]
     log("INFO", f"merged total (<= 5000): {len(merged)}")
     stats(merged)
-    save(merged)
+    with STAGES.stage("save") as st:
+        meta = save(merged)
+        FEEDS.save()
+        HEALTH.save()
+        SCHEDULE.save()
+        KNOWN.prune(merged)
+        KNOWN.save()
+        SEEN.save()
+        URLS.save()
+        NEAR.save()
+        st["items"], st["bytes"] = meta["count"], meta["bytes"]
+    return merged
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    STAGES.enabled = args.stages  # выключенный Stages ничего не копит — включаем до прогона
+    print("[BOOT] starting aggregator")
+    print(f"[BOOT] version: {VER}")
+    print(f"[BOOT] python: {sys.version.split()[0]}")
+    print(f"[BOOT] cwd  = {ROOT}")
+    cfg = load_cfg()
+    sources = cfg.get("sources") or []
+    print(f"[RUN] sources: {len(sources)}")
+    print(f"[RUN] http: {replay_summary(FIXTURES)}")
+    replay = FIXTURES is not None and FIXTURES.mode == "replay"
+    data_dir = args.data_dir
+    if data_dir is None and replay and not os.environ.get("INGEST_DATA_DIR"):
+        # replay не должен менять настоящий архив: пустой каталог на каждый прогон
+        data_dir = Path(tempfile.mkdtemp(prefix="ingest-replay-"))
+    if data_dir is not None:
+        open_state(data_dir)
+    print(f"[RUN] data: {DATA_DIR}")
+    fixed = clock.parse(args.now)
+    if fixed is None and replay:
+        fixed = FIXTURES.recorded_at()
+    if fixed is not None:
+        clock.freeze(fixed)
+        print(f"[RUN] clock fixed at {clock.utcnow().isoformat()}")
+    elif replay:
+        log("WARN", "fixtures have no recorded_at/Date — real clock, replay is not repeatable (use --now)")
+    with profile_run(args.profile):
+        merged = run(sources, args.force_refresh)
     log("DONE", f"saved {len(merged)} items -> {NEWS_JSON}")
     log("DONE", f"meta  -> {META_JSON}")
+    if args.stages:
+        for line in STAGES.lines():
+            log("STAGE", line)
+    if args.profile:
+        log("DONE", f"profile -> {args.profile}")
     print("[BOOT] done")
 
 if __name__ == "__main__":
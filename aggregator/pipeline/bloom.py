@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .canon import url_key
+from .export import atomic_write_bytes
+
+_MAGIC = b"SBF1"
+_HEAD = struct.Struct("<4sddII")      # magic, error, ratio, growth, число фильтров
+_SLICE = struct.Struct("<QdIQQ")      # capacity, error, k, m (бит), count
+_LN2_SQ = math.log(2) ** 2
+
+
+def _hash_pair(key: str) -> Tuple[int, int]:
+    d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+
+
+class BloomFilter:
+    """Обычный фильтр Блума на bytearray; позиции — двойное хэширование h1 + i*h2."""
+
+    __slots__ = ("capacity", "error", "k", "m", "count", "bits")
+
+    def __init__(self, capacity: int, error: float, k: int = 0, m: int = 0, count: int = 0,
+                 bits: Optional[bytearray] = None):
+        self.capacity = capacity
+        self.error = error
+        self.m = m or max(8, int(math.ceil(-capacity * math.log(error) / _LN2_SQ / 8)) * 8)
+        self.k = k or max(1, int(round(self.m / capacity * math.log(2))))
+        self.count = count
+        self.bits = bits if bits is not None else bytearray(self.m // 8)
+
+    def _positions(self, h1: int, h2: int):
+        m = self.m
+        return ((h1 + i * h2) % m for i in range(self.k))
+
+    def contains(self, h1: int, h2: int) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(h1, h2))
+
+    def add(self, h1: int, h2: int) -> None:
+        bits = self.bits
+        for p in self._positions(h1, h2):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """
+    Масштабируемый фильтр Блума (Almeida et al., 2007): цепочка фильтров,
+    каждый следующий в growth раз больше и с ошибкой, умноженной на ratio.
+    Суммарная вероятность ложного срабатывания не превышает error при любом
+    числе записей, а память растёт с их числом (около 3 байт на запись при 1e-4).
+    """
+
+    def __init__(self, error: float = 1e-4, initial: int = 20000, growth: int = 2, ratio: float = 0.9):
+        self.error = error
+        self.initial = initial
+        self.growth = growth
+        self.ratio = ratio
+        self.filters: List[BloomFilter] = []
+
+    def __contains__(self, key: str) -> bool:
+        h1, h2 = _hash_pair(key)
+        return any(f.contains(h1, h2) for f in reversed(self.filters))
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(f.bits) for f in self.filters)
+
+    def add(self, key: str) -> bool:
+        """True — ключа (вероятно) не было, записан."""
+        h1, h2 = _hash_pair(key)
+        if any(f.contains(h1, h2) for f in self.filters):
+            return False
+        last = self.filters[-1] if self.filters else None
+        if last is None or last.count >= last.capacity:
+            n = len(self.filters)
+            # первый фильтр берёт error * (1 - ratio): сумма ряда ошибок сходится к error
+            last = BloomFilter(self.initial * self.growth ** n, self.error * (1 - self.ratio) * self.ratio ** n)
+            self.filters.append(last)
+        last.add(h1, h2)
+        return True
+
+    def to_bytes(self) -> bytes:
+        out = [_HEAD.pack(_MAGIC, self.error, self.ratio, self.growth, len(self.filters))]
+        for f in self.filters:
+            out.append(_SLICE.pack(f.capacity, f.error, f.k, f.m, f.count))
+            out.append(bytes(f.bits))
+        return b"".join(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, initial: int = 20000) -> "ScalableBloomFilter":
+        magic, error, ratio, growth, n = _HEAD.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("not a scalable bloom filter")
+        sbf = cls(error=error, initial=initial, growth=growth, ratio=ratio)
+        off = _HEAD.size
+        for i in range(n):
+            capacity, f_error, k, m, count = _SLICE.unpack_from(data, off)
+            off += _SLICE.size
+            bits = bytearray(data[off:off + m // 8])
+            if len(bits) != m // 8:
+                raise ValueError("truncated bloom filter")
+            off += m // 8
+            if i == 0:
+                sbf.initial = capacity
+            sbf.filters.append(BloomFilter(capacity, f_error, k=k, m=m, count=count, bits=bits))
+        return sbf
+
+
+class SeenFilter:
+    """
+    Всё, что когда-либо собиралось: GUID и ключи ссылок (canon.url_key)
+    в масштабируемом фильтре Блума. В отличие от KnownIndex, не обрезается
+    вместе с архивом (5000 записей), поэтому старая запись из хвоста ленты не
+    вернётся как новая. Ложное срабатывание (с вероятностью error) — новая
+    запись пропускается, поэтому error по умолчанию маленький.
+    Файл бинарный (см. ScalableBloomFilter.to_bytes), параметры хранятся в нём.
+    """
+
+    def __init__(self, path: Union[str, Path], error: float = 1e-4):
+        self.path = Path(path)
+        self.loaded = False
+        self.skipped = 0
+        self.added = 0
+        self._lock = threading.Lock()
+        self.filter = ScalableBloomFilter(error=error)
+        try:
+            if self.path.exists():
+                self.filter = ScalableBloomFilter.from_bytes(self.path.read_bytes())
+                self.loaded = True
+        except Exception:
+            self.filter = ScalableBloomFilter(error=error)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.filter = ScalableBloomFilter(error=self.filter.error)
+            self.loaded = False
+
+    @staticmethod
+    def _keys(guid: str, link: str) -> List[str]:
+        keys = []
+        if guid:
+            keys.append("g:" + guid)
+        if link:
+            keys.append("u:" + url_key(link))
+        return keys
+
+    def seen(self, guid: str, link: str) -> bool:
+        hit = any(k in self.filter for k in self._keys(guid, link))
+        if hit:
+            with self._lock:
+                self.skipped += 1
+        return hit
+
+    def remember(self, guid: str, link: str) -> None:
+        keys = self._keys(guid, link)
+        with self._lock:
+            for k in keys:
+                self.added += self.filter.add(k)
+
+    def seed(self, items: Iterable[Dict[str, Any]], guids: Optional[Dict[str, str]] = None) -> int:
+        """Первый запуск: ссылки архива и известные GUID (KnownIndex.guids)."""
+        before = self.added
+        for it in items:
+            self.remember("", it.get("link") or it.get("url") or "")
+        for guid, link in (guids or {}).items():
+            self.remember(guid, link)
+        return self.added - before
+
+    def summary(self) -> str:
+        f = self.filter
+        return (f"skipped: {self.skipped}, added: {self.added}, entries: {len(f)}, "
+                f"{len(f.filters)} filters / {f.nbytes / 1024:.0f} KiB, fp <= {f.error:g}")
+
+    def save(self) -> None:
+        with self._lock:
+            data = self.filter.to_bytes()
+        atomic_write_bytes(self.path, data)
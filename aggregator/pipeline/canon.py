@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from . import clock
+from .export import atomic_write_text
+
+# Модуль без внешних зависимостей (export и clock — тоже только stdlib):
+# его импортируют и tools/daily_digest.
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+# utm_*, ga_* — по префиксу; остальные — точным именем (ref не режет referrer=…)
+_SCHEME_RE = re.compile(r"^(?:[a-z][a-z0-9+.-]*:)?//", re.I)
+TRACK_PARAM_RE = re.compile(r"^(?:utm_|ga_)|^(?:gclid|yclid|fbclid|mc_cid|mc_eid|ref|ref_src|_openstat)$", re.I)
+
+
+@lru_cache(maxsize=65536)
+def canonical_url(raw: str) -> str:
+    """
+    Каноническая ссылка для показа и хранения: схема/хост в нижнем регистре,
+    без порта по умолчанию, трекинг-параметров, фрагмента и конечного слэша,
+    параметры отсортированы. Схема и www. сохраняются — ссылка остаётся рабочей.
+    """
+    raw = (raw or "").strip()
+    if not raw:
+        return ""
+    try:
+        parts = urlsplit(raw)
+        scheme = (parts.scheme or "https").lower()
+        netloc = (parts.netloc or "").lower()
+        if ":" in netloc:
+            host, port = netloc.rsplit(":", 1)
+            if port == DEFAULT_PORTS.get(scheme):
+                netloc = host
+        q = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACK_PARAM_RE.search(k)]
+        q.sort(key=lambda kv: kv[0])
+        path = parts.path or "/"
+        if path != "/" and path.endswith("/"):
+            path = path[:-1]
+        return urlunsplit((scheme, netloc, path, urlencode(q, doseq=True), ""))
+    except Exception:
+        return raw
+
+
+@lru_cache(maxsize=65536)
+def url_key(raw: str) -> str:
+    """
+    Ключ дедупликации: канонический URL без схемы и www. (http/https, www — одна статья).
+    Строка без схемы уже считается ключом и возвращается как есть (без www.),
+    так что url_key(url_key(x)) == url_key(x) и сохранённые ключи можно прогонять повторно.
+    """
+    raw = (raw or "").strip()
+    if not raw:
+        return ""
+    if not _SCHEME_RE.match(raw):
+        return raw[4:] if raw[:4].lower() == "www." else raw
+    rest = canonical_url(raw).split("://", 1)[-1]
+    return rest[4:] if rest.startswith("www.") else rest
+
+
+def host_key(raw: str) -> str:
+    """Хост без www. — и из ссылки, и из уже готового ключа."""
+    key = url_key(raw)
+    return key.split("/", 1)[0].split("?", 1)[0] if key else ""
+
+
+def item_key(item: Dict[str, Any]) -> str:
+    """Ключ записи: по ссылке, а без неё — заголовок::источник."""
+    for k in ("link", "url", "canonical_url"):
+        v = item.get(k)
+        if v:
+            return url_key(str(v))
+    title = (item.get("title") or "").strip()
+    src = item.get("source") or item.get("source_name") or ""
+    return f"{title}::{src}" if title else ""
+
+
+def item_id(key: str) -> str:
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class UrlIndex:
+    """
+    Общий для ингеста, Telegram-постера и дайджеста индекс записей:
+    ключ (url_key) -> {"id", "first_seen", ["tg"]}. Ингест добавляет только
+    новые ключи, постер отмечает отправленное — полный архив никто не пересчитывает.
+    Файл: {"v": 1, "items": {...}}.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        self.added = 0
+        self._lock = threading.Lock()
+        try:
+            if self.path.exists():
+                raw = json.loads(self.path.read_text("utf-8"))
+                if isinstance(raw, dict) and isinstance(raw.get("items"), dict):
+                    self.items = raw["items"]
+                    self.loaded = True
+        except Exception:
+            self.items = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.items
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.items.get(key)
+
+    def add(self, key: str, now: Optional[float] = None, **extra: Any) -> bool:
+        """True — ключ новый (и записан)."""
+        if not key:
+            return False
+        with self._lock:
+            if key in self.items:
+                return False
+            self.items[key] = {"id": item_id(key), "first_seen": int(now or clock.now()), **extra}
+            self.added += 1
+            return True
+
+    def seed(self, items: Iterable[Dict[str, Any]]) -> int:
+        """
+        Первый запуск: всё, что уже лежит в архиве, — известно и считается
+        разосланным (tg=0), как раньше при сравнении с прошлым news.json.
+        """
+        n = 0
+        for it in items:
+            ts = it.get("published_ts") or None
+            n += self.add(item_key(it), now=ts, tg=0)
+        return n
+
+    def mark(self, key: str, field: str, now: Optional[float] = None) -> None:
+        with self._lock:
+            rec = self.items.get(key)
+            if rec is not None:
+                rec[field] = int(now if now is not None else clock.now())
+
+    def prune(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Ключи, выпавшие из архива, больше не нужны."""
+        keep = {item_key(it) for it in items}
+        self.items = {k: v for k, v in self.items.items() if k in keep}
+
+    def save(self) -> None:
+        text = json.dumps({"v": 1, "items": dict(sorted(self.items.items()))}, ensure_ascii=False,
+                          separators=(",", ":"))
+        atomic_write_text(self.path, text)
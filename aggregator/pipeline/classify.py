@@ -1,14 +1,77 @@
 import re, yaml
-from .normalize import norm_text
+from typing import Dict, Iterable, List, Optional
+from .normalize import norm_text, trie_regex
+
+_META = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+class Classifier:
+    """
+    Все паттерны classify: из rules.yml — в одной регулярке, текст сканируется
+    один раз. Совпадения ищутся с каждой позиции (опережающая проверка), так что
+    они могут перекрываться: «центр продажи» — и «Дилеры», и «Рынок».
+    Литералы (а в rules.yml только они) собраны в префиксное дерево и ищутся
+    в тексте в нижнем регистре без re.I — так sre работает во много раз быстрее.
+    С одной позиции засчитываются все литералы, которые там начинаются
+    («дилерская сеть» — это и «дилер»). Паттерн с метасимволами идёт в
+    отдельную регулярку с именованными группами и re.I; там с одной позиции
+    засчитывается первый по порядку rules.yml.
+    """
+
+    def __init__(self, rules: dict):
+        maps = rules.get('classify', {}) or {}
+        self.categories: List[str] = list(maps)
+        literal: Dict[str, List[str]] = {}   # литерал (нижний регистр) -> категории
+        regex: Dict[str, List[str]] = {}     # паттерн -> категории
+        for cat, pats in maps.items():
+            for pat in pats or []:
+                if not pat:
+                    continue
+                target, key = (regex, pat) if _META.search(pat) else (literal, pat.lower())
+                cats = target.setdefault(key, [])
+                if cat not in cats:
+                    cats.append(cat)
+
+        # найденный литерал -> категории его самого и всех литералов-префиксов
+        self._cats_of_literal: Dict[str, List[str]] = {}
+        for word in literal:
+            cats: List[str] = []
+            for other, other_cats in literal.items():
+                if word.startswith(other):
+                    cats.extend(c for c in other_cats if c not in cats)
+            self._cats_of_literal[word] = cats
+        self._literal_re = re.compile(f"(?=({trie_regex(literal)}))") if literal else None
+
+        self._cats_of_group = {f"p{i}": cats for i, cats in enumerate(regex.values())}
+        parts = [f"(?P<p{i}>{pat})" for i, pat in enumerate(regex)]
+        self._regex_re = re.compile("(?=" + "|".join(parts) + ")", re.I) if parts else None
+
+    def counts(self, title: str, summary: str = "") -> Dict[str, int]:
+        """Категория -> число совпадений, в порядке rules.yml; без совпадений — {}."""
+        text = norm_text((title or "") + " " + (summary or ""))
+        hits: Dict[str, int] = {}
+        if self._literal_re is not None:
+            cats_of = self._cats_of_literal
+            for m in self._literal_re.finditer(text.lower()):
+                for cat in cats_of[m.group(1)]:
+                    hits[cat] = hits.get(cat, 0) + 1
+        if self._regex_re is not None:
+            cats_of = self._cats_of_group
+            for m in self._regex_re.finditer(text):
+                for cat in cats_of[m.lastgroup]:
+                    hits[cat] = hits.get(cat, 0) + 1
+        return {cat: hits[cat] for cat in self.categories if cat in hits}
+
+    def first(self, title: str, summary: str = "") -> Optional[str]:
+        """Первая подошедшая категория по порядку rules.yml — как раньше."""
+        return next(iter(self.counts(title, summary)), None)
+
+    def classify_items(self, items: Iterable[dict]) -> List[Dict[str, int]]:
+        """Пакетно: счётчики категорий для каждой записи (title + summary)."""
+        counts = self.counts
+        return [counts(it.get('title') or '', it.get('summary') or '') for it in items]
 
 def build_classifier(rules: dict):
-    maps = rules.get('classify', {})
-    compiled = {cat: [re.compile(pat, re.I) for pat in pats] for cat, pats in maps.items()}
+    clf = Classifier(rules)
     def classify(title: str, summary: str) -> str|None:
-        text = (title or "") + " " + (summary or "")
-        text = norm_text(text)
-        for cat, regs in compiled.items():
-            if any(r.search(text) for r in regs):
-                return cat
-        return None
+        return clf.first(title, summary)
     return classify
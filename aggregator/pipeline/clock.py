@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+# Часы и случайность ингеста, которые попадают в файлы состояния
+# (расписание, здоровье источников, индексы, news_meta.json). В replay
+# время замораживается (freeze), чтобы повторный прогон дал те же байты.
+RANDOM = random.Random()
+_FIXED: Optional[float] = None
+
+
+def now() -> float:
+    return time.time() if _FIXED is None else _FIXED
+
+
+def utcnow() -> datetime:
+    return datetime.fromtimestamp(now(), tz=timezone.utc)
+
+
+def parse(value: Union[str, float, int, None]) -> Optional[float]:
+    """INGEST_NOW: секунды эпохи или ISO 8601 (без зоны — UTC); пусто/мусор — None."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def freeze(ts: Optional[float]) -> None:
+    """Фиксирует время (None — снова настоящее); джиттер заодно становится воспроизводимым."""
+    global _FIXED
+    _FIXED = None if ts is None else float(ts)
+    RANDOM.seed(_FIXED)
@@ -1,51 +1,19 @@
 from __future__ import annotations
-from typing import List, Dict, Tuple
-from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from typing import Iterable, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
-TRACK_PARAMS_PREFIXES = (
-    "utm_", "ga_", "gclid", "yclid", "fbclid", "mc_cid", "mc_eid", "ref", "ref_src"
-)
-DEFAULT_PORTS = {"http": "80", "https": "443"}
+from . import clock
+from .canon import host_key, item_id, item_key, url_key
+from .merge import epoch_of
+from .minhash import NearDupIndex, item_text, signature
 
 def _canonical_url(raw: str) -> str:
-    if not raw:
-        return ""
-    try:
-        parts = urlsplit(raw)
-        scheme = (parts.scheme or "https").lower()
-        netloc = (parts.netloc or "").lower()
-        if ":" in netloc:
-            host, port = netloc.split(":", 1)
-            if port == DEFAULT_PORTS.get(scheme):
-                netloc = host
-        q = []
-        for k, v in parse_qsl(parts.query, keep_blank_values=False):
-            lk = k.lower()
-            if lk.startswith(TRACK_PARAMS_PREFIXES) or lk in TRACK_PARAMS_PREFIXES:
-                continue
-            q.append((k, v))
-        q.sort(key=lambda kv: kv[0])
-        query = urlencode(q, doseq=True)
-
-        path = parts.path or ""
-        if path != "/" and path.endswith("/"):
-            path = path[:-1]
+    # общий ключ с ингестом/постером/дайджестом: без схемы, www., трекинга и слэша
+    return url_key(raw)
 
-        canon = urlunsplit((scheme, netloc, path, query, ""))
-        if canon.startswith("http://www."):
-            canon = "http://" + canon[11:]
-        elif canon.startswith("https://www."):
-            canon = "https://" + canon[12:]
-        return canon
-    except Exception:
-        return raw.strip()
-
-def _host(url: str) -> str:
-    try:
-        return (urlsplit(url).netloc or "").lower().lstrip("www.")
-    except Exception:
-        return ""
+def _host(raw: str) -> str:
+    # хост из исходной ссылки (host_key понимает и готовый ключ, но ссылка надёжнее)
+    return host_key(raw)
 
 def _parse_dt(s: str) -> datetime | None:
     try:
@@ -53,10 +21,115 @@ def _parse_dt(s: str) -> datetime | None:
     except Exception:
         return None
 
-def dedupe(items: List[Dict]) -> List[Dict]:
+def drop_near_duplicates(items: List[Dict], index: NearDupIndex,
+                         now: Optional[float] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Кросс-источниковые почти-дубли (один пресс-релиз у разных изданий):
+    MinHash по заголовку и началу анонса, кандидаты — из LSH-индекса недавних
+    записей. Запись, похожая на уже проиндексированную с другого хоста (или на
+    более раннюю в этом же списке), отбрасывается; остальные добавляются в индекс.
+    С записями своего хоста не сравниваем: у одного сайта похожие тексты — это
+    серии («Итоги продаж… LCV» / «…Пикапы»), а не перепечатки.
+    Записи с тем же ключом не трогаем — это полный дубль, его уберёт dedup по ссылке.
+    Возвращает (оставленные, отброшенные).
+    """
+    now = now or clock.now()
+    kept: List[Dict] = []
+    dropped: List[Dict] = []
+    for it in items:
+        key = item_key(it)
+        sig = signature(item_text(it)) if key and key not in index else None
+        if sig is None:
+            kept.append(it)
+            continue
+        match = index.query(sig, skip_host=host_key(it.get("link") or it.get("url") or ""))
+        if match:
+            index.stats["dropped"] += 1
+            dropped.append(it)
+            continue
+        index.add(key, sig, ts=now)  # время попадания в индекс: окно считается от него
+        kept.append(it)
+    return kept, dropped
+
+def seed_near_index(items: List[Dict], index: NearDupIndex, now: Optional[float] = None,
+                    story_threshold: float = 0.4) -> int:
+    """
+    Первый запуск: в индекс попадают записи архива моложе окна индекса
+    и распределяются по сюжетам от старых к новым. Сами записи архива
+    здесь не меняются: story_id/story_rep ставит assign_stories — новым
+    записям и представителю сюжета, к которому они присоединились.
+    """
+    now = now or clock.now()
+    recent = []
+    for it in items:
+        ts = epoch_of(it)
+        key = item_key(it)
+        if not key or key in index or ts < now - index.window:
+            continue
+        sig = signature(item_text(it))
+        if sig is not None:
+            index.add(key, sig, ts=ts)
+            recent.append((ts, it))
+    recent.sort(key=lambda p: p[0])
+    assign_stories([it for _, it in recent], index, story_threshold, write=False)
+    return len(recent)
+
+def assign_stories(items: List[Dict], index: NearDupIndex, threshold: float = 0.4, write: bool = True,
+                   archive: Iterable[Dict] = ()) -> int:
+    """
+    Сюжеты: связанные публикации (разные издания об одном отчёте рынка и т.п.).
+    Каждая запись получает story_id и story_rep — ссылку представителя сюжета.
+    Только инкрементально: запись присоединяется к сюжету самой похожей
+    (>= threshold) уже распределённой записи индекса, иначе открывает свой
+    сюжет и становится его представителем (id = canon.item_id её ключа).
+    Архив не пересчитывается (write=False — только индекс, так сюжеты
+    засевает seed_near_index). Исключение — представитель из archive, к чьему
+    сюжету присоединилась новая запись: без story_id он выглядел бы одиночкой,
+    хотя на него уже ссылается story_rep; ему поля ставятся один раз.
+    Записи без подписи (слишком короткий текст) — сюжет из одной записи.
+    Возвращает число записей, присоединённых к существующим сюжетам.
+    """
+    joined = 0
+    by_link: Optional[Dict[str, Dict]] = None
+    for it in items:
+        key = item_key(it)
+        if not key:
+            continue
+        link = it.get("link") or it.get("url") or ""
+        story_id = index.story_of.get(key)
+        if story_id is None:
+            sig = index.sigs.get(key)
+            match = index.related(sig, threshold, exclude=key) if sig else None
+            if match:
+                story_id = index.story_of[match[0]]
+                joined += 1
+                index.stats["joined"] += 1
+                if write:
+                    if by_link is None:
+                        by_link = {(a.get("link") or a.get("url")): a for a in archive}
+                    _stamp_rep(by_link, story_id, index.stories.get(story_id))
+            else:
+                story_id = item_id(key)
+                index.stats["new_stories"] += 1
+            story = index.assign(key, story_id, rep=link)
+        else:
+            story = index.stories.get(story_id) or [link, 1]
+        if write:
+            it["story_id"] = story_id
+            it["story_rep"] = story[0]
+    return joined
+
+def _stamp_rep(by_link: Dict[str, Dict], story_id: str, story: Optional[List]) -> None:
+    rec = by_link.get(story[0]) if story else None
+    if rec is not None and "story_id" not in rec:
+        rec["story_id"] = story_id
+        rec["story_rep"] = story[0]
+
+def dedupe(items: List[Dict], near: Optional[NearDupIndex] = None) -> List[Dict]:
     """
     1) Удаляем полные дубли по каноническому URL.
     2) Удаляем «почти дубли»: одинаковый title на том же домене в пределах 72 часов.
+    3) Если передан near — ещё и похожие тексты с других источников (drop_near_duplicates).
     Порядок сохраняем (первый встреченный — главный).
     """
     out: List[Dict] = []
@@ -74,7 +147,7 @@ def dedupe(items: List[Dict]) -> List[Dict]:
             seen_urls.add(url)
 
         title_norm = (it.get("title") or "").strip().lower()
-        host = _host(url or (it.get("url") or ""))
+        host = _host(it.get("link") or it.get("url") or "")
         dt = _parse_dt(it.get("published_at") or "") or _parse_dt(it.get("updated_at") or "")
         # округляем до 72-часовых бакетов (3 суток)
         bucket = int((dt or datetime.min).timestamp() // (72 * 3600))
@@ -88,4 +161,6 @@ def dedupe(items: List[Dict]) -> List[Dict]:
 
         out.append(it)
 
+    if near is not None:
+        out, _ = drop_near_duplicates(out, near)
     return out
@@ -1,6 +1,10 @@
+import hashlib
 import json
+import os
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from . import clock
 
 def export_json(items: List[Dict], path: Union[str, Path]):
     path = Path(path)
@@ -8,3 +12,120 @@ def export_json(items: List[Dict], path: Union[str, Path]):
     payload = {"items": items}
     with path.open("w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
+
+def pretty_from_env() -> bool:
+    """NEWS_JSON_PRETTY=1 — писать news.json с отступами (по умолчанию компактно)."""
+    return os.environ.get("NEWS_JSON_PRETTY", "") in ("1", "true", "yes")
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.tmp")
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _write_items(f, items: Iterable[Dict[str, Any]], pretty: bool) -> Dict[str, Any]:
+    """
+    Пишет JSON-массив по одному элементу, считая sha256 на лету.
+    Вывод побайтно совпадает с json.dumps(items, indent=2 | компактно).
+    """
+    h = hashlib.sha256()
+    size = 0
+    count = 0
+
+    def put(s: str) -> None:
+        nonlocal size
+        b = s.encode("utf-8")
+        h.update(b)
+        size += len(b)
+        f.write(b)
+
+    put("[")
+    for it in items:
+        if pretty:
+            body = json.dumps(it, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            put(("\n  " if count == 0 else ",\n  ") + body)
+        else:
+            put(("" if count == 0 else ",") + json.dumps(it, ensure_ascii=False, separators=(",", ":")))
+        count += 1
+    put("\n]" if pretty and count else "]")
+    return {"sha256": h.hexdigest(), "bytes": size, "count": count}
+
+def atomic_write_text(path: Union[str, Path], text: str) -> None:
+    """Запись через временный файл + fsync + rename: файл либо старый, либо новый целиком."""
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    with tmp.open("wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+def read_meta(path: Union[str, Path]) -> Dict[str, Any]:
+    """news_meta.json как словарь; нет файла или он битый — пустой."""
+    try:
+        meta = json.loads(Path(path).read_text("utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+def save_news(items: List[Dict[str, Any]], news_path: Union[str, Path], meta_path: Union[str, Path],
+              pretty: bool = False, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Атомарно записывает news.json и news_meta.json.
+    Оба файла сначала целиком пишутся во временные и синхронизируются на диск,
+    затем переименовываются. В meta кладётся sha256 news.json — по нему
+    читатель может проверить, что пара файлов согласована.
+    extra — свои поля писателя (версия справочника тегов у main.py); чужие
+    поля из прежнего meta переносятся, чтобы translate_news.py их не стирал.
+    """
+    news_path, meta_path = Path(news_path), Path(meta_path)
+    news_path.parent.mkdir(parents=True, exist_ok=True)
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    news_tmp, meta_tmp = _tmp_path(news_path), _tmp_path(meta_path)
+    try:
+        with news_tmp.open("wb") as f:
+            info = _write_items(f, items, pretty)
+            f.flush()
+            os.fsync(f.fileno())
+        meta = {
+            "updated_at": clock.utcnow().isoformat(),
+            "count": info["count"],
+            "sha256": info["sha256"],
+            "bytes": info["bytes"],
+        }
+        for key, value in read_meta(meta_path).items():
+            meta.setdefault(key, value)
+        meta.update(extra or {})
+        with meta_tmp.open("wb") as f:
+            f.write(json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(news_tmp, news_path)
+        os.replace(meta_tmp, meta_path)
+    finally:
+        for tmp in (news_tmp, meta_tmp):
+            if tmp.exists():
+                tmp.unlink()
+    _fsync_dir(news_path.parent)
+    return meta
+
+def file_sha256(path: Union[str, Path]) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Union
+
+from .export import atomic_write_text
+
+
+class FeedCache:
+    """
+    Валидаторы условного GET по каждой ленте: ETag, Last-Modified и хэш тела.
+    Формат файла: {url: {"etag", "last_modified", "sha1", "size"}}.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.data: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"not_modified": 0, "same_hash": 0, "fetched": 0, "bytes_in": 0, "bytes_saved": 0}
+        self._lock = threading.Lock()
+        try:
+            if self.path.exists():
+                raw = json.loads(self.path.read_text("utf-8"))
+                if isinstance(raw, dict):
+                    self.data = raw
+        except Exception:
+            self.data = {}
+
+    def clear(self) -> None:
+        self.data = {}
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        rec = self.data.get(url) or {}
+        h: Dict[str, str] = {}
+        if rec.get("etag"):
+            h["If-None-Match"] = rec["etag"]
+        if rec.get("last_modified"):
+            h["If-Modified-Since"] = rec["last_modified"]
+        return h
+
+    def not_modified(self, url: str) -> None:
+        """Сервер ответил 304 — экономия равна размеру прошлого тела."""
+        with self._lock:
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += int((self.data.get(url) or {}).get("size") or 0)
+
+    def changed(self, url: str, headers: Any, body: bytes) -> bool:
+        """
+        Запоминает валидаторы ответа 200. False — тело совпало по хэшу
+        с прошлым прогоном, и парсить его заново не нужно.
+        """
+        digest = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            prev = self.data.get(url) or {}
+            self.data[url] = {
+                "etag": headers.get("ETag") or "",
+                "last_modified": headers.get("Last-Modified") or "",
+                "sha1": digest,
+                "size": len(body),
+            }
+            self.stats["bytes_in"] += len(body)
+            if prev.get("sha1") == digest:
+                self.stats["same_hash"] += 1
+                return False
+            self.stats["fetched"] += 1
+            return True
+
+    def summary(self) -> str:
+        s = self.stats
+        skipped = s["not_modified"] + s["same_hash"]
+        return (f"feeds skipped: {skipped} (304: {s['not_modified']}, same hash: {s['same_hash']}), "
+                f"parsed: {s['fetched']}, bytes in: {s['bytes_in']}, bytes saved: {s['bytes_saved']}")
+
+    def save(self) -> None:
+        atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=2, sort_keys=True))
@@ -1,9 +1,145 @@
 import re
-from .normalize import norm_text
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from .normalize import norm_text, trie_regex
+
+RULES_YML = Path(__file__).resolve().parents[1] / "rules.yml"
+
+class ExcludeRules:
+    """
+    Исключения, собранные один раз в одну регулярку по тексту в нижнем регистре:
+      keywords   — целое слово: «лесовоз», но не «лесовозный»;
+      prefixes   — начало слова: «зерновоз» ловит и «зерновозы», «зерновозный»;
+      substrings — подстрока где угодно (как `w in title.lower()` в дайджесте);
+      domains    — хост ссылки и все его поддомены: tass.ru блокирует и www.tass.ru.
+    Границы слова — (?<!\\w) и (?!\\w): \\w в str-регулярках юникодный, так что
+    кириллица обрабатывается как буквы, а ключ с пунктуацией по краям
+    («c++», «-авто») не ломается, как ломался бы \\b.
+    """
+
+    def __init__(self, keywords: Iterable[str] = (), prefixes: Iterable[str] = (),
+                 substrings: Iterable[str] = (), domains: Iterable[str] = ()):
+        parts = []
+        for words, head, tail in ((keywords, r"(?<!\w)", r"(?!\w)"), (prefixes, r"(?<!\w)", ""),
+                                  (substrings, "", "")):
+            words = {w.strip().lower() for w in words if w and w.strip()}
+            if words:
+                parts.append(f"{head}(?:{trie_regex(words)}){tail}")
+        self._re = re.compile("|".join(parts)) if parts else None
+        self.domains = {d.strip().lower().lstrip(".") for d in domains if d and d.strip()}
+
+    @classmethod
+    def from_rules(cls, rules: dict) -> "ExcludeRules":
+        """Секция exclude: из rules.yml."""
+        ex = (rules or {}).get('exclude') or {}
+        return cls(ex.get('keywords') or (), ex.get('prefixes') or (),
+                   ex.get('substrings') or (), ex.get('domains') or ())
+
+    def blocked_domain(self, link: str) -> Optional[str]:
+        """Заблокированный домен, под который попадает ссылка (или хост), иначе None."""
+        if not self.domains or not link:
+            return None
+        host = urlsplit(link if "//" in link else "//" + link).hostname or ""
+        labels = host.rstrip(".").split(".")
+        for i in range(len(labels) - 1):
+            cand = ".".join(labels[i:])
+            if cand in self.domains:
+                return cand
+        return None
+
+    def match_text(self, text: str) -> Optional[str]:
+        """Первое совпавшее слово в тексте или None."""
+        if self._re is None or not text:
+            return None
+        m = self._re.search(text.lower())
+        return m.group(0) if m else None
+
+    def reason(self, item: dict) -> Optional[str]:
+        """Почему запись исключается: 'domain:…' / 'keyword:…', либо None."""
+        dom = self.blocked_domain(item.get('link') or item.get('url') or item.get('domain') or '')
+        if dom:
+            return f"domain:{dom}"
+        if self._re is not None:
+            kw = self.match_text(norm_text((item.get('title') or '') + ' ' + (item.get('summary') or '')))
+            if kw:
+                return f"keyword:{kw}"
+        return None
+
+    def excludes(self, item: dict) -> bool:
+        return self.reason(item) is not None
+
+    def filter(self, items: Iterable[dict]) -> Tuple[List[dict], List[Tuple[dict, str]]]:
+        """Пакетно: (оставленные, [(исключённая запись, причина)])."""
+        kept: List[dict] = []
+        dropped: List[Tuple[dict, str]] = []
+        reason = self.reason
+        for it in items:
+            why = reason(it)
+            if why:
+                dropped.append((it, why))
+            else:
+                kept.append(it)
+        return kept, dropped
+
+def load_exclude(path: Union[str, Path, None] = None) -> ExcludeRules:
+    """exclude: из rules.yml; нет файла — пустой движок (ничего не исключает)."""
+    import yaml  # здесь, а не наверху: дайджест берёт движок без pyyaml
+    path = Path(path or RULES_YML)
+    rules = yaml.safe_load(path.read_text("utf-8")) if path.exists() else {}
+    return ExcludeRules.from_rules(rules or {})
+
+class Prefilter:
+    """
+    Фильтр на дешёвых полях ленты (домен ссылки, title, summary) до сетевых
+    стадий: скачивания ленты, полного текста, картинки, перевода. Считает,
+    сколько отсечено и сколько запросов не пришлось делать.
+    """
+
+    def __init__(self, rules: ExcludeRules):
+        self.rules = rules
+        self.stats = {"feeds": 0, "entries": 0, "domain": 0, "keyword": 0, "requests_saved": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str, why: str, requests: int) -> None:
+        with self._lock:
+            self.stats[key] += 1
+            self.stats[why.split(":", 1)[0]] += 1
+            self.stats["requests_saved"] += requests
+
+    def feed_blocked(self, url: str) -> Optional[str]:
+        """Домен самой ленты заблокирован — её не качаем (экономия — один запрос)."""
+        dom = self.rules.blocked_domain(url)
+        if dom:
+            self._count("feeds", f"domain:{dom}", 1)
+        return dom
+
+    def entry_reason(self, link: str, title: str, summary: str, requests: int = 0) -> Optional[str]:
+        """Причина отсечь запись или None; requests — сколько запросов ей ещё предстояло."""
+        why = self.rules.reason({'link': link, 'title': title, 'summary': summary})
+        if why:
+            self._count("entries", why, requests)
+        return why
+
+    def summary(self, requests: bool = True) -> str:
+        """
+        Строка для лога. requests=False — без «requests saved»: там, где
+        у записей нет своих сетевых стадий (aggregator/main.py), счётчик
+        отражал бы одни пропущенные ленты, а они и так в «feeds skipped».
+        """
+        s = self.stats
+        out = (f"feeds skipped: {s['feeds']}, entries dropped: {s['entries']} "
+               f"(domain: {s['domain']}, keyword: {s['keyword']})")
+        return out + f", requests saved: {s['requests_saved']}" if requests else out
+
+@lru_cache(maxsize=32)
+def _compiled(keywords: Tuple[str, ...], prefixes: Tuple[str, ...], substrings: Tuple[str, ...],
+              domains: Tuple[str, ...]) -> ExcludeRules:
+    return ExcludeRules(keywords, prefixes, substrings, domains)
 
 def should_exclude(item: dict, exclude_rules: dict) -> bool:
-    text = norm_text((item.get('title') or '') + ' ' + (item.get('summary') or ''))
-    for kw in exclude_rules.get('keywords', []):
-        if re.search(rf'\b{re.escape(kw)}\b', text, flags=re.I):
-            return True
-    return False
+    """Старый интерфейс: движок по секции exclude собирается один раз и кэшируется."""
+    engine = _compiled(*(tuple(exclude_rules.get(k) or ()) for k in ('keywords', 'prefixes', 'substrings', 'domains')))
+    return engine.excludes(item)
@@ -1,29 +1,54 @@
 # aggregator/pipeline/fullgrab.py
 from __future__ import annotations
 
+import atexit
+import multiprocessing as mp
+import os
 import re
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from dataclasses import dataclass
-from urllib.parse import urljoin, urlsplit
-from typing import Optional
+from urllib.parse import urljoin
+from typing import Iterator, Optional, Tuple
 
 import requests  # type: ignore
 from bs4 import BeautifulSoup  # type: ignore
+from lxml import etree  # type: ignore
+from lxml.html import document_fromstring  # type: ignore
 import trafilatura  # type: ignore
+from trafilatura.utils import HTML_PARSER, load_html  # type: ignore
+
+from .grabcache import from_env as grab_cache_from_env
+from .hostlimit import HostLimiter
+from .profiles import Profile, load_profiles
+from .replay import install_from_env
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+# Общая сессия для лент и статей (connectors/rss.py тоже ходит через неё)
+HTTP = requests.Session()
+HTTP.headers.update(HEADERS)
+FIXTURES = install_from_env(HTTP)
+# Одновременных запросов статей к одному хосту (grab зовут из пула потоков)
+HOSTS = HostLimiter(int(os.environ.get("GRAB_PER_HOST") or 2))
+# Режим «только картинка»: сколько байт страницы читать максимум
+HEAD_MAX_BYTES = 512 * 1024
+IMAGE_STATS = {"pages": 0, "bytes": 0, "stopped_early": 0}
+_STATS_LOCK = threading.Lock()
+# Извлечение текста — в пуле процессов (0 — в вызывающем потоке, без лимита CPU)
+PROCESSES = int(os.environ.get("GRAB_PROCESSES") or os.cpu_count() or 1)
+# Лимит CPU на trafilatura для одного документа, секунд
+CPU_LIMIT = float(os.environ.get("GRAB_CPU_LIMIT_S") or 5)
+# Сколько ждать результат из пула (с очередью), секунд: воркер, застрявший
+# вне досягаемости SIGPROF, не держит поток grab — текст берём по селекторам
+WALL_LIMIT = float(os.environ.get("GRAB_WALL_LIMIT_S") or CPU_LIMIT * 6)
+# Кэш уже извлечённых статей (None — выключен через GRAB_CACHE=0)
+GRAB_CACHE = grab_cache_from_env()
 
-# Пер-источник оверрайды (дополняйте по мере необходимости)
-SOURCE_OVERRIDES = {
-    "grozovy.ru": {
-        "content_selector": "article, .entry-content, .post-content, .single-content",
-        "image_selector": "meta[property='og:image'], meta[name='twitter:image'], article img, .entry-content img, .post-content img, .single-content img",
-    },
-    "zr.ru": {  # «За рулём»
-        "force_fetch_article": True,
-        "content_selector": "article, .article__content, .content, .post-content",
-        "image_selector": "meta[property='og:image'], meta[name='twitter:image'], article img, .article__content img, .content img",
-    },
-}
+# Профили извлечения по доменам (aggregator/extract_profiles.yml), собираются при импорте
+PROFILES = load_profiles()
 
 BAD_IMG_EXT = (".svg", ".ico")
 
@@ -32,10 +57,6 @@ class GrabResult:
     html: str              # очищенный HTML основного контента (абзацы)
     lead_image: Optional[str]  # первая нормальная картинка (если нашлась)
 
-def _domain(url: str) -> str:
-    host = urlsplit(url).netloc.lower()
-    return host[4:] if host.startswith("www.") else host
-
 def _looks_like_img(url: str | None) -> bool:
     if not url:
         return False
@@ -52,24 +73,37 @@ def _abs(url: str | None, base: str) -> Optional[str]:
     except Exception:
         return url
 
-def _first_image_generic(soup: BeautifulSoup, base_url: str) -> Optional[str]:
+# XPath для поиска картинки компилируем один раз на процесс
+_META_IMAGE_XPATHS = [
+    etree.XPath("//meta[@property='og:image']"),
+    etree.XPath("//meta[@name='twitter:image']"),
+    etree.XPath("//link[contains(concat(' ', normalize-space(@rel), ' '), ' image_src ')]"),
+]
+_FIRST_IMG = etree.XPath("//img")
+_BODY = etree.XPath("//body")
+_SKIP_TEXT_TAGS = frozenset(("script", "style", "noscript", "picture", "source"))
+
+def _img_candidate(node) -> Optional[str]:
+    cand = node.get("src") or node.get("data-src") or node.get("data-original") or node.get("data-lazy-src") or node.get("content") or node.get("href")
+    if not cand and node.get("srcset"):
+        cand = node.get("srcset").split(",")[0].split()[0]
+    return cand
+
+def _first_image_generic(tree, base_url: str) -> Optional[str]:
     # 1) og/twitter/link rel=image_src
-    metas = [
-        ("meta", {"property": "og:image"}),
-        ("meta", {"name": "twitter:image"}),
-        ("link", {"rel": "image_src"}),
-    ]
-    for tag, attrs in metas:
-        el = soup.find(tag, attrs=attrs)
-        if el:
+    for xp in _META_IMAGE_XPATHS:
+        found = xp(tree)
+        if found:
+            el = found[0]
             cand = el.get("content") or el.get("href")
             cand = _abs(cand, base_url)
             if _looks_like_img(cand):
                 return cand
 
     # 2) первый <img> (учитываем srcset/data-src)
-    img = soup.find("img")
-    if img:
+    found = _FIRST_IMG(tree)
+    if found:
+        img = found[0]
         cand = img.get("src") or img.get("data-src") or img.get("data-original") or img.get("data-lazy-src")
         if not cand and img.get("srcset"):
             # берём первый URL из srcset
@@ -80,16 +114,19 @@ def _first_image_generic(soup: BeautifulSoup, base_url: str) -> Optional[str]:
 
     return None
 
-def _best_image_by_selector(soup: BeautifulSoup, base_url: str, selector: str) -> Optional[str]:
-    for node in soup.select(selector):
-        cand = node.get("src") or node.get("data-src") or node.get("data-original") or node.get("data-lazy-src") or node.get("content") or node.get("href")
-        if not cand and node.get("srcset"):
-            cand = node.get("srcset").split(",")[0].split()[0]
-        cand = _abs(cand, base_url)
+def _best_image_by_selector(tree, base_url: str, selector) -> Optional[str]:
+    for node in selector(tree):
+        cand = _abs(_img_candidate(node), base_url)
         if _looks_like_img(cand):
             return cand
     return None
 
+def _paragraphs(text: str) -> str:
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    # обратно — в простой HTML с <p>
+    parts = [f"<p>{p}</p>" for p in [x.strip() for x in text.split("\n\n")] if p.strip()]
+    return "\n".join(parts)
+
 def _sanitize_html(html: str) -> str:
     soup = BeautifulSoup(html or "", "lxml")
     # убираем скрипты/стили
@@ -103,60 +140,259 @@ def _sanitize_html(html: str) -> str:
     for br in soup.find_all("br"):
         br.replace_with("\n")
     text = soup.get_text("\n", strip=True)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    # обратно — в простой HTML с <p>
-    parts = [f"<p>{p}</p>" for p in [x.strip() for x in text.split("\n\n")] if p.strip()]
-    return "\n".join(parts)
+    return _paragraphs(text)
 
-def grab(url: str) -> Optional[GrabResult]:
+def _sanitize_text(text: str) -> str:
     """
-    Скачиваем страницу статьи и достаём:
-      - очищённый HTML (абзацы в <p>)
-      - ведущую картинку
+    Вывод trafilatura — обычный текст. Без разметки и сущностей HTML-парсер
+    вернул бы его одной строкой, поэтому второй разбор не нужен.
+    """
+    if "<" in text or "&" in text or "\r" in text or "\x00" in text:
+        return _sanitize_html(text)
+    return _paragraphs(text.strip())
+
+def _strings(node) -> Iterator[str]:
+    # как BeautifulSoup.get_text: текст и хвосты, без комментариев и вырезаемых тегов
+    tag = node.tag
+    if isinstance(tag, str) and tag not in _SKIP_TEXT_TAGS:
+        if node.text:
+            yield node.text
+        for child in node:
+            yield from _strings(child)
+            if child.tail:
+                yield child.tail
+
+def _sanitize_node(node) -> str:
+    """То же, что _sanitize_html(узел.decode()), но прямо по уже разобранному дереву."""
+    parts = [s.strip() for s in _strings(node)]
+    return _paragraphs("\n".join(p for p in parts if p))
+
+class _Deadline(BaseException):
+    # BaseException: trafilatura глушит Exception внутри, а нам нужно выйти наружу
+    pass
+
+def _on_deadline(signum, frame):
+    raise _Deadline()
+
+@contextmanager
+def _cpu_deadline(seconds: Optional[float]) -> Iterator[None]:
     """
+    Ограничение процессорного времени блока (ITIMER_PROF -> SIGPROF).
+    Сигналы доставляются только главному потоку, поэтому вне его
+    (in-process режим из пула потоков) лимит не ставится.
+    """
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    prev = signal.signal(signal.SIGPROF, _on_deadline)
+    signal.setitimer(signal.ITIMER_PROF, seconds)
     try:
-        r = requests.get(url, headers=HEADERS, timeout=20, allow_redirects=True)
-        r.raise_for_status()
-        final_url = r.url
-        html = r.text
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, prev)
+
+def extract_page(html: str, final_url: str, cpu_limit: Optional[float] = None,
+                 use_trafilatura: bool = True) -> Tuple[str, Optional[str]]:
+    """
+    CPU-часть grab(): (очищенный HTML, ведущая картинка) из готовой страницы.
+    Документ разбирается один раз: то же lxml-дерево идёт в trafilatura,
+    в селекторы профиля домена и в поиск картинки. Если trafilatura не уложился
+    в cpu_limit секунд (или use_trafilatura=False) — берём текст по селектору
+    профиля домена.
+    """
+    # Разбираем так же, как trafilatura разобрал бы строку. Его «починка»
+    # кривого <html .../> иногда отрезает начало документа — тогда для
+    # картинки и селекторов разбираем документ целиком (редкий случай).
+    tree = load_html(html)
+    doc = tree if tree is not None and tree.tag == "html" else document_fromstring(html, parser=HTML_PARSER)
+    prof = PROFILES.for_url(final_url)
 
-        # Текст: пробуем trafilatura как основной экстрактор
-        # (подсовываем уже скачанный html)
-        extracted = None
+    # Ведущая картинка — до извлечения, пока дерево точно нетронуто
+    img = _lead_image(doc, final_url, prof)
+
+    if prof.remove is not None:
+        # мусор сайта (блоки «читайте также», подписи и т.п.) — из обоих деревьев
+        for t in ([doc] if tree is None or tree is doc else [tree, doc]):
+            for node in prof.remove(t):
+                if node.getparent() is not None:
+                    node.drop_tree()
+
+    # Текст: пробуем trafilatura как основной экстрактор
+    # (подсовываем уже разобранное дерево; сам он работает на копии)
+    extracted = None
+    if use_trafilatura and not prof.skip_trafilatura:
         try:
-            extracted = trafilatura.extract(
-                html,
-                include_comments=False,
-                include_images=False,
-                include_tables=False,
-                url=final_url,
-            )
+            with _cpu_deadline(cpu_limit):
+                extracted = trafilatura.extract(
+                    tree if tree is not None else html,
+                    include_comments=False,
+                    include_images=False,
+                    include_tables=False,
+                    url=final_url,
+                )
+        except _Deadline:
+            print(f"[WARN] fullgrab: trafilatura > {cpu_limit}s CPU, fallback to selectors: {final_url}")
+            extracted = None
         except Exception:
             extracted = None
 
-        if not extracted:
-            # фолбэк — вытащим основной контейнер по дефолтным селекторам
-            soup = BeautifulSoup(html, "lxml")
-            content = None
-            dom = _domain(final_url)
-            over = SOURCE_OVERRIDES.get(dom, {})
-            sel = over.get("content_selector") or "article, .article, .post, .post-content, .entry-content, .content"
-            node = soup.select_one(sel)
-            content = node.decode() if node else soup.body.decode() if soup.body else html
-            html_content = _sanitize_html(content)
+    if not extracted:
+        # фолбэк — основной контейнер по селектору профиля
+        found = prof.content(doc) if prof.content is not None else []
+        if found:
+            html_content = _sanitize_node(found[0])
         else:
-            html_content = _sanitize_html(extracted)
-
-        # Ведущая картинка
-        soup2 = BeautifulSoup(html, "lxml")
-        dom = _domain(final_url)
-        over = SOURCE_OVERRIDES.get(dom, {})
-        img = None
-        if "image_selector" in over:
-            img = _best_image_by_selector(soup2, final_url, over["image_selector"])
-        if not img:
-            img = _first_image_generic(soup2, final_url)
+            body = _BODY(doc)
+            html_content = _sanitize_node(body[0] if body else doc)
+    else:
+        html_content = _sanitize_text(extracted)
+    return html_content, img
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _pool() -> Optional[ProcessPoolExecutor]:
+    """Пул процессов для извлечения: создаётся при первой статье и живёт весь прогон."""
+    global _POOL
+    if PROCESSES <= 0:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: родитель многопоточный (пул grab), fork здесь небезопасен
+            _POOL = ProcessPoolExecutor(max_workers=PROCESSES, mp_context=mp.get_context("spawn"))
+        return _POOL
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=True, cancel_futures=True)
+            _POOL = None
 
+atexit.register(shutdown_pool)
+
+def _extract(html: str, final_url: str) -> Tuple[str, Optional[str]]:
+    pool = _pool()
+    if pool is None:
+        return extract_page(html, final_url, CPU_LIMIT)
+    future = pool.submit(extract_page, html, final_url, CPU_LIMIT)
+    try:
+        return future.result(timeout=WALL_LIMIT)
+    except TimeoutError:
+        future.cancel()  # ещё в очереди — не запустится; уже идёт — досчитает впустую
+        print(f"[WARN] fullgrab: extraction > {WALL_LIMIT:g}s wall, fallback to selectors: {final_url}")
+        return extract_page(html, final_url, use_trafilatura=False)
+    except BrokenProcessPool:
+        # воркер упал (память, segfault в lxml) или не смог стартовать —
+        # до конца прогона извлекаем в текущем потоке
+        global _POOL, PROCESSES
+        with _POOL_LOCK:
+            if PROCESSES > 0:
+                print("[WARN] fullgrab: process pool is broken, extracting in-process")
+            PROCESSES, _POOL = 0, None
+        return extract_page(html, final_url, CPU_LIMIT)
+
+def grab(url: str) -> Optional[GrabResult]:
+    """
+    Скачиваем страницу статьи и достаём:
+      - очищённый HTML (абзацы в <p>)
+      - ведущую картинку
+    Сеть — в вызывающем потоке, разбор и извлечение — в пуле процессов.
+    """
+    try:
+        with HOSTS.slot(url):
+            r = HTTP.get(url, timeout=20, allow_redirects=True)
+        r.raise_for_status()
+        html_content, img = _extract(r.text, r.url)
         return GrabResult(html=html_content, lead_image=img)
     except Exception:
         return None
+
+def grab_cached(url: str) -> Optional[GrabResult]:
+    """grab() через дисковый кэш: уже извлечённые статьи повторно не качаем."""
+    if GRAB_CACHE is None:
+        return grab(url)
+    hit = GRAB_CACHE.get(url)
+    if hit is not None:
+        # (None, None) — недавняя неудача: не качаем снова до конца neg_ttl
+        return GrabResult(html=hit[0], lead_image=hit[1]) if hit[0] is not None else None
+    res = grab(url)
+    if res is not None:
+        GRAB_CACHE.put(url, res.html, res.lead_image)
+    else:
+        GRAB_CACHE.put(url, None, None, negative="page")
+    return res
+
+def _lead_image(tree, base_url: str, prof: Profile) -> Optional[str]:
+    img = None
+    if prof.image is not None:
+        img = _best_image_by_selector(tree, base_url, prof.image)
+    if not img:
+        img = _first_image_generic(tree, base_url)
+    return img
+
+def _charset(content_type: str) -> Optional[str]:
+    m = re.search(r"charset=([\w.-]+)", content_type or "", re.I)
+    return m.group(1) if m else None
+
+def grab_image(url: str) -> Optional[str]:
+    """
+    Только ведущая картинка: страница читается потоком и разбирается по мере
+    прихода. Останавливаемся, когда картинка уже определена — после </head>
+    (og/twitter/image_src) или на первом <img> в теле. Если у хоста в профиле
+    есть селектор картинки — только когда сработал он: og и первый <img>
+    до него ответом не считаются. Ни trafilatura, ни очистки текста здесь нет.
+    """
+    try:
+        with HOSTS.slot(url):
+            with HTTP.get(url, timeout=20, allow_redirects=True, stream=True) as r:
+                r.raise_for_status()
+                final_url = r.url
+                prof = PROFILES.for_url(final_url)
+                parser = etree.HTMLPullParser(events=("start", "end"), encoding=_charset(r.headers.get("Content-Type", "")),
+                                              remove_comments=True)
+                root, img, read, early = None, None, 0, False
+                for chunk in r.iter_content(16 * 1024):
+                    read += len(chunk)
+                    parser.feed(chunk)
+                    check = False
+                    for ev, el in parser.read_events():
+                        if root is None:
+                            root = el.getroottree().getroot()
+                        if (ev == "end" and el.tag == "head") or (ev == "start" and el.tag == "img"):
+                            check = True
+                    if check and root is not None:
+                        if prof.image is not None:
+                            img = _best_image_by_selector(root, final_url, prof.image)
+                            early = img is not None
+                        else:
+                            img = _first_image_generic(root, final_url)
+                            # для общего случая первый <img> окончательный, даже если он «плохой»
+                            early = bool(img or _FIRST_IMG(root))
+                        if early:
+                            break
+                    if read >= HEAD_MAX_BYTES:
+                        break
+                if not early:
+                    root = parser.close()
+                    img = _lead_image(root, final_url, prof) if root is not None else None
+        with _STATS_LOCK:
+            IMAGE_STATS["pages"] += 1
+            IMAGE_STATS["bytes"] += read
+            IMAGE_STATS["stopped_early"] += int(early)
+        return img
+    except Exception:
+        return None
+
+def grab_image_cached(url: str) -> Optional[str]:
+    """grab_image() через кэш статей: годится и запись полного grab()."""
+    if GRAB_CACHE is None:
+        return grab_image(url)
+    hit = GRAB_CACHE.get(url, need_html=False)
+    if hit is not None:
+        return hit[1]
+    img = grab_image(url)
+    # страница без картинки тоже результат — помним его neg_ttl, а не качаем каждый прогон
+    GRAB_CACHE.put(url, None, img, negative="" if img else "image")
+    return img
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+from .normalize import norm_text, trie_regex
+
+GAZETTEER_YML = Path(__file__).resolve().parents[1] / "gazetteer.yml"
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+def _fold(s: str) -> str:
+    return s.lower().replace("ё", "е")
+
+class Gazetteer:
+    """
+    Теги по справочнику (gazetteer.yml): производители и типы техники. Все
+    варианты написания собраны один раз в одну регулярку-префиксное дерево по
+    тексту в нижнем регистре, запись сканируется за один проход.
+      "тягач"  — целое слово;
+      "тягач*" — основа: тягача, тягачи, тягачей…
+    Обе ветки начинаются только с начала слова ((?<!\\w)), поэтому «прицеп*»
+    не срабатывает внутри «полуприцепа». Найденное слово даёт теги своего
+    варианта и всех основ, которые являются его началом («полуприцепы» —
+    это и «полуприцеп*»), — как литералы-префиксы в classify.Classifier.
+    """
+
+    def __init__(self, groups: Dict[str, Dict[str, Iterable[str]]]):
+        self.tags: List[str] = []               # порядок справочника
+        words: Dict[str, List[str]] = {}        # вариант целым словом -> теги
+        stems: Dict[str, List[str]] = {}        # основа (без "*") -> теги
+        for entries in (groups or {}).values():
+            for tag, variants in (entries or {}).items():
+                tag = str(tag)
+                if tag not in self.tags:
+                    self.tags.append(tag)
+                for v in variants or ():
+                    v = _fold(str(v).strip())
+                    target = stems if v.endswith("*") else words
+                    v = v.rstrip("*").strip()
+                    if v:
+                        tags = target.setdefault(v, [])
+                        if tag not in tags:
+                            tags.append(tag)
+
+        # найденный текст -> теги его самого и всех основ-префиксов
+        self._tags_of: Dict[str, List[str]] = {}
+        for found in list(words) + list(stems):
+            tags = list(words.get(found, ()))
+            for stem, stem_tags in stems.items():
+                if found.startswith(stem):
+                    tags.extend(t for t in stem_tags if t not in tags)
+            self._tags_of[found] = tags
+
+        # версия справочника: меняется вместе с вариантами и тегами, а не с
+        # комментариями в yml; по ней main.py решает, переразмечать ли архив
+        self.version = hashlib.sha256(json.dumps([words, stems], ensure_ascii=False, sort_keys=True)
+                                      .encode("utf-8")).hexdigest()[:12]
+
+        parts = []
+        if words:
+            parts.append(f"(?P<w>{trie_regex(words)})(?!\\w)")
+        if stems:
+            parts.append(f"(?P<s>{trie_regex(stems)})")
+        self._re = re.compile("(?<!\\w)(?:" + "|".join(parts) + ")") if parts else None
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path, None] = None) -> "Gazetteer":
+        """Справочник из yml; нет файла — пустой (тегов не ставит)."""
+        import yaml  # здесь, а не наверху: как load_exclude в filtering.py
+        path = Path(path or GAZETTEER_YML)
+        data = yaml.safe_load(path.read_text("utf-8")) if path.exists() else {}
+        return cls(data or {})
+
+    def match(self, text: str) -> List[str]:
+        """Теги текста в порядке первого упоминания, без повторов."""
+        if self._re is None or not text:
+            return []
+        out: List[str] = []
+        tags_of = self._tags_of
+        for m in self._re.finditer(_fold(text)):
+            for tag in tags_of[m.group(m.lastgroup)]:
+                if tag not in out:
+                    out.append(tag)
+        return out
+
+    def tag(self, item: dict) -> List[str]:
+        """Теги записи по заголовку и анонсу (разметка из summary убирается)."""
+        summary = item.get("summary") or ""
+        if "<" in summary:
+            summary = _TAG_RE.sub(" ", summary)
+        return self.match(norm_text((item.get("title") or "") + " " + summary))
+
+    def tag_items(self, items: Iterable[dict]) -> int:
+        """
+        Пакетно пишет tags в каждую запись; теги, уже стоявшие у записи,
+        сохраняются впереди. Без тегов поле не пишется — пустые списки только
+        раздували бы news.json. Возвращает число записей хотя бы с одним тегом.
+        """
+        tagged = 0
+        for it in items:
+            tags = list(it.get("tags") or ())
+            tags.extend(t for t in self.tag(it) if t not in tags)
+            if tags:
+                it["tags"] = tags
+                tagged += 1
+            else:
+                it.pop("tags", None)
+        return tagged
+
+_DEFAULT: Optional[Gazetteer] = None
+
+def default_gazetteer() -> Gazetteer:
+    """Справочник из GAZETTEER (по умолчанию gazetteer.yml), собирается один раз на процесс."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = Gazetteer.from_file(os.environ.get("GAZETTEER") or None)
+    return _DEFAULT
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+from . import clock
+from .canon import url_key
+
+DEFAULT_DIR = Path(__file__).resolve().parents[2] / ".cache" / "fullgrab"
+
+
+def cache_key(url: str) -> str:
+    """Ключ статьи — sha1 общего ключа дедупликации (pipeline/canon.url_key)."""
+    return hashlib.sha1(url_key(url).encode("utf-8")).hexdigest()
+
+
+class GrabCache:
+    """
+    Кэш извлечённых статей на диске: один JSON на статью
+    ({"url", "html", "lead_image", "stored_at", ["negative"]}), имя — sha1 ключа URL.
+    Записи старше ttl считаются промахом. Давность использования — mtime файла
+    (обновляется при попадании), при превышении budget удаляются самые старые.
+    Неудачи тоже кэшируются, но на neg_ttl: negative="page" — страницу не удалось
+    скачать/разобрать, negative="image" — картинки на странице нет.
+    Блокировка держится только на индексе в памяти; чтение и запись файлов —
+    вне её, так что потоки grab не ждут друг друга. Запись без fsync: кэш можно
+    потерять, а недописанный файл читается как битый — это промах.
+    """
+
+    def __init__(self, root: Union[str, Path], ttl: float = 7 * 86400, budget: int = 200 * 2 ** 20,
+                 key: Callable[[str], str] = cache_key, neg_ttl: float = 6 * 3600):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.neg_ttl = neg_ttl
+        self.budget = budget
+        self.key = key
+        self.stats = {"hits": 0, "misses": 0, "negative": 0, "stored": 0, "expired": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._lru: Optional["OrderedDict[str, int]"] = None  # имя файла -> размер, от старых к новым
+        self._size = 0
+
+    def _index(self) -> "OrderedDict[str, int]":
+        # каталог сканируем лениво — один раз на процесс
+        if self._lru is None:
+            entries = []
+            if self.root.exists():
+                for e in os.scandir(self.root):
+                    if e.is_file() and e.name.endswith(".json"):
+                        st = e.stat()
+                        entries.append((st.st_mtime, e.name, st.st_size))
+            entries.sort()
+            self._lru = OrderedDict((name, size) for _, name, size in entries)
+            self._size = sum(size for _, _, size in entries)
+        return self._lru
+
+    def _forget(self, name: str) -> bool:
+        """Убирает запись из индекса (под self._lock); True — она там была и файл надо удалить."""
+        lru = self._index()
+        if name not in lru:
+            return False
+        self._size -= lru.pop(name)
+        return True
+
+    def _unlink(self, name: str) -> None:
+        try:
+            (self.root / name).unlink()
+        except OSError:
+            pass
+
+    def get(self, url: str, need_html: bool = True) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """
+        (html, lead_image) из кэша или None. Записи «только картинка» (html=None,
+        см. fullgrab.grab_image) для полного текста считаются промахом.
+        Свежая неудача — (None, None): качать снова пока не нужно.
+        """
+        name = self.key(url) + ".json"
+        with self._lock:
+            if name not in self._index():
+                self.stats["misses"] += 1
+                return None
+        try:
+            rec = json.loads((self.root / name).read_text("utf-8"))
+        except Exception:
+            rec = None
+        negative = rec.get("negative") if isinstance(rec, dict) else None
+        ttl = self.neg_ttl if negative else self.ttl
+        if not isinstance(rec, dict) or clock.now() - float(rec.get("stored_at") or 0) > ttl:
+            # устаревшая или битая запись — тот же промах
+            with self._lock:
+                self.stats["misses"] += 1
+                if isinstance(rec, dict):
+                    self.stats["expired"] += 1
+                drop = self._forget(name)
+            if drop:
+                self._unlink(name)
+            return None
+        if need_html and (negative == "image" or (not negative and rec.get("html") is None)):
+            # «картинки нет» или запись «только картинка» ничего не говорят о тексте
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            lru = self._index()
+            if name in lru:
+                lru.move_to_end(name)
+            self.stats["negative" if negative else "hits"] += 1
+        try:
+            os.utime(self.root / name)
+        except OSError:
+            pass
+        if negative:
+            return None, None
+        html = rec.get("html")
+        return (html or "") if need_html else html, rec.get("lead_image")
+
+    def put(self, url: str, html: Optional[str], lead_image: Optional[str], negative: str = "") -> None:
+        """negative="page"|"image" — запомнить неудачу на neg_ttl (html/lead_image не нужны)."""
+        name = self.key(url) + ".json"
+        rec: dict = {"url": url, "html": html, "lead_image": lead_image, "stored_at": int(clock.now())}
+        if negative:
+            rec["negative"] = negative
+        data = json.dumps(rec, ensure_ascii=False).encode("utf-8")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.root / name)
+        except OSError:
+            return
+        evicted = []
+        with self._lock:
+            lru = self._index()
+            self._size += len(data) - lru.pop(name, 0)
+            lru[name] = len(data)
+            self.stats["stored"] += 1
+            while self._size > self.budget and len(lru) > 1:
+                oldest = next(iter(lru))
+                self._forget(oldest)
+                evicted.append(oldest)
+                self.stats["evicted"] += 1
+        for old in evicted:
+            self._unlink(old)
+
+    def summary(self) -> str:
+        s = self.stats
+        with self._lock:
+            self._index()
+            files, mb = len(self._lru or ()), self._size / 2 ** 20
+        return (f"articles from cache: {s['hits']}, known failures: {s['negative']}, fetched: {s['misses']} "
+                f"(expired: {s['expired']}), stored: {s['stored']}, evicted: {s['evicted']}, "
+                f"on disk: {files} files / {mb:.1f} MB")
+
+
+def from_env() -> Optional[GrabCache]:
+    """
+    GRAB_CACHE_DIR=<dir>  — где хранить (по умолчанию .cache/fullgrab в корне репо)
+    GRAB_CACHE_TTL_H=168  — сколько часов статья считается свежей
+    GRAB_CACHE_NEG_TTL_H=6 — сколько часов помнить неудачу (страница не скачалась, картинки нет)
+    GRAB_CACHE_MB=200     — бюджет на диске
+    GRAB_CACHE=0          — выключить кэш
+    """
+    if os.environ.get("GRAB_CACHE", "1") in ("0", "false", "no"):
+        return None
+    ttl_h = float(os.environ.get("GRAB_CACHE_TTL_H") or 168)
+    neg_h = float(os.environ.get("GRAB_CACHE_NEG_TTL_H") or 6)
+    mb = float(os.environ.get("GRAB_CACHE_MB") or 200)
+    return GrabCache(os.environ.get("GRAB_CACHE_DIR") or DEFAULT_DIR, ttl=ttl_h * 3600, budget=int(mb * 2 ** 20),
+                     neg_ttl=neg_h * 3600)
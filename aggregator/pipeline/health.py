@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from . import clock
+from .export import atomic_write_text
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rnd: Optional[random.Random] = None) -> float:
+    """Экспоненциальная задержка с полным джиттером: U(0, min(cap, base * 2^attempt))."""
+    rnd = rnd or random
+    return rnd.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class SourceHealth:
+    """
+    Здоровье источников между прогонами (circuit breaker).
+    После `threshold` подряд неудачных прогонов источник пропускается до конца
+    кулдауна; кулдаун растёт вдвое с каждой следующей неудачей (до `max_cooldown`).
+    По окончании кулдауна делается одна пробная попытка (half-open).
+    Формат файла: {url: {"name", "failures", "open_until", "last_error", "last_ok"}}.
+    """
+
+    def __init__(self, path: Union[str, Path], threshold: int = 3,
+                 cooldown: float = 6 * 3600, max_cooldown: float = 7 * 86400):
+        self.path = Path(path)
+        self.threshold = max(1, int(threshold))
+        self.cooldown = float(cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self.data: Dict[str, Dict[str, Any]] = {}
+        self.skipped: list[str] = []
+        self._lock = threading.Lock()
+        try:
+            if self.path.exists():
+                raw = json.loads(self.path.read_text("utf-8"))
+                if isinstance(raw, dict):
+                    self.data = raw
+        except Exception:
+            self.data = {}
+
+    def allow(self, url: str, name: str = "", now: Optional[float] = None) -> bool:
+        now = clock.now() if now is None else now
+        rec = self.data.get(url) or {}
+        if float(rec.get("open_until") or 0) > now:
+            with self._lock:
+                self.skipped.append(name or url)
+            return False
+        return True
+
+    def open_until(self, url: str) -> float:
+        return float((self.data.get(url) or {}).get("open_until") or 0)
+
+    def success(self, url: str, name: str = "", now: Optional[float] = None) -> None:
+        now = clock.now() if now is None else now
+        with self._lock:
+            self.data[url] = {"name": name, "failures": 0, "open_until": 0, "last_error": "", "last_ok": now}
+
+    def failure(self, url: str, name: str, error: str, now: Optional[float] = None) -> None:
+        now = clock.now() if now is None else now
+        with self._lock:
+            rec = dict(self.data.get(url) or {})
+            fails = int(rec.get("failures") or 0) + 1
+            rec.update({"name": name, "failures": fails, "last_error": error[:300]})
+            if fails >= self.threshold:
+                span = min(self.max_cooldown, self.cooldown * (2 ** (fails - self.threshold)))
+                # джиттер ±10%, чтобы упавшие вместе источники не просыпались одним прогоном
+                rec["open_until"] = now + span * clock.RANDOM.uniform(0.9, 1.1)
+            self.data[url] = rec
+
+    def summary(self, now: Optional[float] = None) -> str:
+        now = clock.now() if now is None else now
+        opened = [r.get("name") or u for u, r in self.data.items() if float(r.get("open_until") or 0) > now]
+        failing = [f"{r.get('name') or u}x{r.get('failures')}" for u, r in self.data.items()
+                   if int(r.get("failures") or 0) and float(r.get("open_until") or 0) <= now]
+        return (f"circuit open: {len(opened)} {sorted(opened)} | skipped this run: {len(self.skipped)} | "
+                f"failing: {sorted(failing)}")
+
+    def save(self) -> None:
+        atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=2, sort_keys=True))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from urllib.parse import urlsplit
+
+
+def host_of(url: str) -> str:
+    try:
+        return (urlsplit(url).netloc or "").lower()
+    except Exception:
+        return ""
+
+
+class HostLimiter:
+    """
+    Ограничение одновременных запросов на один хост.
+    Общий объект на все потоки: семафор создаётся лениво на каждый netloc.
+    """
+
+    def __init__(self, per_host: int = 2):
+        self.per_host = max(1, int(per_host))
+        self._lock = threading.Lock()
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _sem(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        sem = self._sem(host_of(url))
+        with sem:
+            yield
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import cProfile
+import collections
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+
+class Stages:
+    """
+    Учёт времени по стадиям прогона: wall, CPU, число элементов и байт.
+    stage() — для последовательных стадий main(); add() — накопление из
+    рабочих потоков (сеть/парсинг/нормализация по источникам), там wall — сумма.
+    Выключенный (enabled=False) ничего не замеряет и не берёт блокировку:
+    stage()/timed() отдают пустой словарь, add() сразу выходит.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.order: List[str] = []
+        self.data: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, wall: float = 0.0, cpu: float = 0.0, items: int = 0, nbytes: int = 0) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            rec = self.data.get(name)
+            if rec is None:
+                self.order.append(name)
+                rec = self.data[name] = {"wall": 0.0, "cpu": 0.0, "items": 0, "bytes": 0, "calls": 0}
+            rec["wall"] += wall
+            rec["cpu"] += cpu
+            rec["items"] += items
+            rec["bytes"] += nbytes
+            rec["calls"] += 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, int]]:
+        """with STAGES.stage("sort") as st: ...; st["items"] = len(out)"""
+        extra = {"items": 0, "bytes": 0}
+        if not self.enabled:
+            yield extra
+            return
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield extra
+        finally:
+            self.add(name, time.perf_counter() - w0, time.process_time() - c0, extra["items"], extra["bytes"])
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[Dict[str, int]]:
+        """То же, но CPU — только текущего потока (для стадий внутри пула)."""
+        extra = {"items": 0, "bytes": 0}
+        if not self.enabled:
+            yield extra
+            return
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield extra
+        finally:
+            self.add(name, time.perf_counter() - w0, time.thread_time() - c0, extra["items"], extra["bytes"])
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {k: {kk: round(v, 4) if isinstance(v, float) else v for kk, v in self.data[k].items()}
+                for k in self.order}
+
+    def lines(self) -> List[str]:
+        out = []
+        for name in self.order:
+            r = self.data[name]
+            out.append(f"{name:<10} wall {r['wall']:8.3f}s  cpu {r['cpu']:8.3f}s  "
+                       f"items {int(r['items']):>6}  bytes {int(r['bytes']):>10}  calls {int(r['calls'])}")
+        return out
+
+
+class _Sampler:
+    """
+    Семплирующий профилировщик всех потоков: раз в `interval` секунд снимает
+    стеки и копит их в свёрнутом формате flamegraph.pl / speedscope:
+    "thread;mod:func;mod:func N".
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="sampler", daemon=True)
+
+    def _loop(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, path: Path) -> None:
+        self._stop.set()
+        self._thread.join()
+        path.write_text("".join(f"{k} {v}\n" for k, v in sorted(self.counts.items())), "utf-8")
+
+
+@contextmanager
+def profile_run(path: Optional[Union[str, Path]]) -> Iterator[None]:
+    """
+    Профиль всего прогона в файл:
+      *.prof            — cProfile (pstats, snakeviz, flameprof): главный поток и все
+                          потоки, запущенные внутри прогона (сеть/разбор/normalize
+                          в пуле), сведены в один файл. На Python 3.12+ cProfile
+                          допускает один профиль на процесс — там только главный поток.
+      *.folded / *.txt  — свёрнутые стеки для flamegraph.pl / speedscope (все потоки)
+    """
+    if not path:
+        yield
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix in (".folded", ".txt"):
+        sampler = _Sampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop(path)
+        return
+    profiles = [cProfile.Profile()]
+    lock = threading.Lock()
+
+    def start_in_thread(frame, event, arg):
+        # первый вызов в новом потоке (воркеры ThreadPoolExecutor): свой профиль,
+        # enable() заменяет этот хук на cProfile для текущего потока
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # 3.12+: cProfile на sys.monitoring — один активный профиль на процесс
+            sys.setprofile(None)
+            return
+        with lock:
+            profiles.append(prof)
+
+    threading.setprofile(start_in_thread)
+    profiles[0].enable()
+    try:
+        yield
+    finally:
+        profiles[0].disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(profiles[0])
+        with lock:
+            others = profiles[1:]
+        for prof in others:
+            try:
+                stats.add(prof)
+            except TypeError:
+                pass  # поток не успел ничего вызвать — пустой профиль
+        stats.dump_stats(str(path))
+
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Union
+
+from .canon import url_key
+from .export import atomic_write_text
+
+
+class KnownIndex:
+    """
+    Индекс уже собранных записей: GUID -> ссылка плюс множество ключей ссылок
+    архива (canon.url_key — http/https, www. и трекинг не делают запись новой).
+    Известные записи отсекаются до normalize(), поэтому стоимость прогона
+    зависит от числа новых записей, а не от длины лент.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.guids: Dict[str, str] = {}
+        self.links: set[str] = set()
+        self.skipped = 0
+        self._lock = threading.Lock()
+        try:
+            if self.path.exists():
+                raw = json.loads(self.path.read_text("utf-8"))
+                if isinstance(raw, dict):
+                    self.guids = dict(raw.get("guids") or {})
+        except Exception:
+            self.guids = {}
+
+    def seed(self, items: Iterable[Dict[str, Any]]) -> None:
+        """
+        Ссылки текущего архива известны даже без записанного GUID.
+        GUID без записи в архиве (файл потерян/обрезан) не считается известным.
+        """
+        self.prune(items)
+
+    def is_known(self, guid: str, link: str) -> bool:
+        hit = bool((guid and guid in self.guids) or (link and url_key(link) in self.links))
+        if hit:
+            with self._lock:
+                self.skipped += 1
+        return hit
+
+    def claim(self, guid: str, link: str) -> bool:
+        """
+        Проверка и запоминание одним шагом под блокировкой: True — запись
+        встретилась впервые (в архиве и в этом прогоне) и теперь известна.
+        """
+        key = url_key(link) if link else ""
+        with self._lock:
+            if (guid and guid in self.guids) or (key and key in self.links):
+                return False
+            if guid and link:
+                self.guids[guid] = link
+            if key:
+                self.links.add(key)
+            return True
+
+    def remember(self, guid: str, link: str) -> None:
+        if guid and link:
+            with self._lock:
+                self.guids[guid] = link
+
+    def prune(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Оставляем только то, что реально осталось в архиве после обрезки."""
+        keep = {url_key(it["link"]) for it in items if it.get("link")}
+        self.guids = {g: l for g, l in self.guids.items() if url_key(l) in keep}
+        self.links = keep
+
+    def save(self) -> None:
+        payload = {"guids": dict(sorted(self.guids.items()))}
+        atomic_write_text(self.path, json.dumps(payload, ensure_ascii=False, indent=2))
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import heapq
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Ключ для записей без даты — как datetime.min в старом sort_by_date()
+MIN_TS = datetime.min.replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_ts(val: Optional[str]) -> float:
+    if not val:
+        return MIN_TS
+    try:
+        dt = datetime.fromisoformat(val.replace("Z", "+00:00"))
+    except Exception:
+        return MIN_TS
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def epoch_of(it: Dict[str, Any]) -> float:
+    ts = it.get("published_ts")
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        return ts
+    return parse_ts(it.get("published_at"))
+
+
+def stamp(items: List[Dict[str, Any]]) -> int:
+    """Проставляет published_ts тем, у кого его нет. Возвращает число разобранных дат."""
+    n = 0
+    for it in items:
+        ts = it.get("published_ts")
+        if not isinstance(ts, (int, float)) or isinstance(ts, bool):
+            it["published_ts"] = parse_ts(it.get("published_at"))
+            n += 1
+    return n
+
+
+def is_sorted_desc(items: List[Dict[str, Any]]) -> bool:
+    prev = None
+    for it in items:
+        ts = epoch_of(it)
+        if prev is not None and ts > prev:
+            return False
+        prev = ts
+    return True
+
+
+def merge_sorted(fresh: List[Dict[str, Any]], *runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Сортирует только свежую пачку и линейно сливает её с уже отсортированными
+    (от новых к старым) списками. При равных датах порядок как у стабильной
+    сортировки конкатенации fresh + runs: сначала свежие, затем по порядку списков.
+    """
+    head = sorted(fresh, key=epoch_of, reverse=True)
+    tails = []
+    for run in runs:
+        if not is_sorted_desc(run):
+            # архив правили руками — один раз пересортируем по-старому
+            run = sorted(run, key=epoch_of, reverse=True)
+        tails.append(run)
+    return list(heapq.merge(head, *tails, key=epoch_of, reverse=True))
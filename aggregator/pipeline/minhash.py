@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import base64
+import json
+import re
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from . import clock
+from .export import atomic_write_text
+
+# 64 позиции подписи = 16 полос по 4 строки: пара попадает в кандидаты
+# с вероятностью 1-(1-J^4)^16 — ~0.5 при J=0.5 и ~0.99 при J=0.75
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# для сюжетов порог ниже — полосы короче: 32 по 2, кандидат с вероятностью ~0.99 при J=0.4
+STORY_BANDS = 32
+STORY_ROWS = NUM_PERM // STORY_BANDS
+SHINGLE = 5          # символьные n-граммы: устойчивы к перестановке и замене отдельных слов
+MIN_SHINGLES = 12    # у совсем коротких текстов оценка сходства шумная — не сравниваем
+TEXT_LIMIT = 600     # символов summary: лид пресс-релиза, без хвостов «читать далее»
+
+_BIN_BITS = 6                        # 2**6 = NUM_PERM корзин
+_VAL_BITS = 32 - _BIN_BITS
+_VAL_MASK = (1 << _VAL_BITS) - 1
+_EMPTY = 1 << 32
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"\w+")
+
+
+def item_text(item: Dict) -> str:
+    """Заголовок + начало анонса без разметки, в нижнем регистре, ё -> е."""
+    summary = item.get("summary") or item.get("content_html") or ""
+    if "<" in summary:
+        summary = _TAG_RE.sub(" ", summary)
+    text = f"{item.get('title') or ''} {summary[:TEXT_LIMIT]}".lower().replace("ё", "е")
+    return " ".join(_WORD_RE.findall(text))
+
+
+def shingles(text: str, k: int = SHINGLE) -> set[str]:
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def signature(text: str) -> Optional[Tuple[int, ...]]:
+    """
+    MinHash-подпись текста или None, если текст слишком короткий.
+    One permutation hashing: каждый шингл хэшируется один раз (crc32), старшие
+    биты выбирают корзину, в корзине держим минимум. Пустые корзины заполняются
+    значением ближайшей непустой справа со сдвигом на расстояние (densification),
+    чтобы подписи коротких текстов оставались сравнимыми.
+    """
+    sh = shingles(text)
+    if len(sh) < MIN_SHINGLES:
+        return None
+    sig = [_EMPTY] * NUM_PERM
+    for s in sh:
+        h = (zlib.crc32(s.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF  # перемешиваем линейный crc32
+        b, v = h >> _VAL_BITS, h & _VAL_MASK
+        if v < sig[b]:
+            sig[b] = v
+    for i in range(NUM_PERM):
+        if sig[i] == _EMPTY:
+            for d in range(1, NUM_PERM):
+                v = sig[(i + d) % NUM_PERM]
+                if v <= _VAL_MASK:
+                    sig[i] = v + (d << _VAL_BITS)
+                    break
+    return tuple(sig)
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Оценка коэффициента Жаккара по доле совпавших позиций подписи."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _bands(sig: Tuple[int, ...], bands: int = BANDS, rows: int = ROWS) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(i, sig[i * rows:(i + 1) * rows]) for i in range(bands)]
+
+
+def _pack(sig: Tuple[int, ...]) -> str:
+    return base64.b64encode(array("I", sig).tobytes()).decode("ascii")
+
+
+def _unpack(raw: str) -> Tuple[int, ...]:
+    arr = array("I")
+    arr.frombytes(base64.b64decode(raw))
+    return tuple(arr)
+
+
+class NearDupIndex:
+    """
+    LSH-индекс MinHash-подписей недавних записей: ключ (canon.item_key) ->
+    (ts, подпись). Новая запись сравнивается только с записями, у которых
+    совпала хотя бы одна полоса подписи, а не со всем архивом. Записи старше
+    window секунд выбрасываются при сохранении.
+    Заодно хранит сюжеты (dedupe.assign_stories): ключ -> id сюжета и
+    id -> [ссылка представителя, число записей]; для них — свои, более короткие полосы.
+    Файл: {"v": 1, "perm": 64, "bands": 16, "items": {key: [ts, base64(uint32 * 64), story_id]},
+    "stories": {story_id: [rep_link, n]}}.
+    """
+
+    def __init__(self, path: Union[str, Path], threshold: float = 0.6, window: float = 14 * 86400):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.window = window
+        self.sigs: Dict[str, Tuple[int, ...]] = {}
+        self.ts: Dict[str, float] = {}
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        self.story_buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        self.story_of: Dict[str, str] = {}
+        self.stories: Dict[str, List] = {}
+        self.loaded = False
+        self.stats = {"checked": 0, "candidates": 0, "dropped": 0, "joined": 0, "new_stories": 0}
+        try:
+            if self.path.exists():
+                raw = json.loads(self.path.read_text("utf-8"))
+                # другие параметры подписи — старый индекс несравним, строим заново
+                if isinstance(raw, dict) and raw.get("perm") == NUM_PERM and raw.get("bands") == BANDS:
+                    self.stories = {k: list(v) for k, v in (raw.get("stories") or {}).items()}
+                    for key, rec in (raw.get("items") or {}).items():
+                        self._put(key, float(rec[0]), _unpack(rec[1]))
+                        if len(rec) > 2 and rec[2] in self.stories:
+                            self._join(key, rec[2])
+                    self.loaded = True
+        except Exception:
+            self.sigs, self.ts, self.buckets = {}, {}, {}
+            self.story_buckets, self.story_of, self.stories = {}, {}, {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.sigs
+
+    def __len__(self) -> int:
+        return len(self.sigs)
+
+    def _put(self, key: str, ts: float, sig: Tuple[int, ...]) -> None:
+        self.sigs[key] = sig
+        self.ts[key] = ts
+        for band in _bands(sig):
+            self.buckets.setdefault(band, []).append(key)
+
+    def _join(self, key: str, story_id: str) -> None:
+        self.story_of[key] = story_id
+        for band in _bands(self.sigs[key], STORY_BANDS, STORY_ROWS):
+            self.story_buckets.setdefault(band, []).append(key)
+
+    def add(self, key: str, sig: Tuple[int, ...], ts: Optional[float] = None) -> None:
+        if key and key not in self.sigs:
+            self._put(key, ts or clock.now(), sig)
+
+    def query(self, sig: Tuple[int, ...], skip_host: str = "") -> Optional[Tuple[str, float]]:
+        """
+        Самая похожая запись индекса с оценкой сходства >= threshold или None.
+        skip_host — не сравнивать с записями этого хоста (ключи url_key начинаются с хоста).
+        """
+        self.stats["checked"] += 1
+        seen: set[str] = set()
+        best: Optional[Tuple[str, float]] = None
+        prefix = skip_host + "/" if skip_host else None
+        for band in _bands(sig):
+            for key in self.buckets.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if prefix and (key.startswith(prefix) or key == skip_host):
+                    continue
+                sim = similarity(sig, self.sigs[key])
+                if sim >= self.threshold and (best is None or sim > best[1]):
+                    best = (key, sim)
+        self.stats["candidates"] += len(seen)
+        return best
+
+    def related(self, sig: Tuple[int, ...], threshold: float, exclude: str = "") -> Optional[Tuple[str, float]]:
+        """Самая похожая запись, уже отнесённая к сюжету, со сходством >= threshold."""
+        seen: set[str] = set()
+        best: Optional[Tuple[str, float]] = None
+        for band in _bands(sig, STORY_BANDS, STORY_ROWS):
+            for key in self.story_buckets.get(band, ()):
+                if key in seen or key == exclude:
+                    continue
+                seen.add(key)
+                sim = similarity(sig, self.sigs[key])
+                if sim >= threshold and (best is None or sim > best[1]):
+                    best = (key, sim)
+        return best
+
+    def assign(self, key: str, story_id: str, rep: str = "") -> List:
+        """Относит запись индекса к сюжету (новому — с представителем rep)."""
+        story = self.stories.get(story_id)
+        if story is None:
+            story = self.stories[story_id] = [rep, 0]
+        story[1] += 1
+        if key in self.sigs and key not in self.story_of:
+            self._join(key, story_id)
+        return story
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Убирает записи старше окна; бакеты пересобираются. Сюжеты без
+        оставшихся в окне записей забываются. Возвращает число удалённых.
+        """
+        cutoff = (now or clock.now()) - self.window
+        old = [k for k, ts in self.ts.items() if ts < cutoff]
+        if old:
+            keep = [(k, self.ts[k], self.sigs[k], self.story_of.get(k)) for k in self.sigs if self.ts[k] >= cutoff]
+            self.sigs, self.ts, self.buckets = {}, {}, {}
+            self.story_buckets, self.story_of = {}, {}
+            for key, ts, sig, story_id in keep:
+                self._put(key, ts, sig)
+                if story_id:
+                    self._join(key, story_id)
+            live = set(self.story_of.values())
+            self.stories = {k: v for k, v in self.stories.items() if k in live}
+        return len(old)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"checked: {s['checked']}, lsh candidates: {s['candidates']}, "
+                f"dropped: {s['dropped']}, indexed: {len(self.sigs)}")
+
+    def story_summary(self) -> str:
+        s = self.stats
+        multi = sum(1 for _, n in self.stories.values() if n > 1)
+        return (f"joined existing: {s['joined']}, new: {s['new_stories']}, "
+                f"in window: {len(self.stories)} ({multi} with 2+ items)")
+
+    def save(self, now: Optional[float] = None) -> None:
+        self.prune(now)
+        items = {}
+        for k in sorted(self.sigs):
+            rec = [int(self.ts[k]), _pack(self.sigs[k])]
+            if k in self.story_of:
+                rec.append(self.story_of[k])
+            items[k] = rec
+        payload = {"v": 1, "perm": NUM_PERM, "bands": BANDS, "items": items,
+                   "stories": dict(sorted(self.stories.items()))}
+        atomic_write_text(self.path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
@@ -1,4 +1,5 @@
 import re, html
+from typing import Iterable, Optional
 def norm_text(s:str)->str:
     s = s or ""
     s = html.unescape(s)
@@ -6,8 +7,32 @@ def norm_text(s:str)->str:
     return s
 
 def to_tags(text:str)->list[str]:
-    base = []
-    t = text.lower()
-    for k in ["цистерн","рама","подвеск","крепёж","рынок","дилер","двигател","тягач","экспо","выставк"]:
-        if k in t: base.append(k)
-    return base
+    """Теги текста по справочнику gazetteer.yml (см. pipeline/gazetteer.py)."""
+    from .gazetteer import default_gazetteer  # gazetteer сам импортирует normalize
+    return default_gazetteer().match(norm_text(text))
+
+def trie_regex(words:Iterable[str])->str:
+    """Регулярка-префиксное дерево из литералов: «дилер(?:ская сеть)?» и т.п."""
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> Optional[str]:
+        alts, chars = [], []
+        for ch in sorted(k for k in node if k):
+            sub = build(node[ch])
+            if sub is None:
+                chars.append(re.escape(ch))
+            else:
+                alts.append(re.escape(ch) + sub)
+        if chars:
+            alts.append(chars[0] if len(chars) == 1 else "[" + "".join(chars) + "]")
+        if not alts:
+            return None
+        out = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + out + ")?" if "" in node else out
+
+    return build(trie) or ""
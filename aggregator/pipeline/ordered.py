@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], workers: int = 4, window: int = 32) -> Iterator[R]:
+    """
+    fn(item) в пуле потоков, результаты — в исходном порядке.
+    Вход читается лениво: в работе и в ожидании выдачи не больше `window`
+    элементов, пока голова очереди не готова, новые не берутся (backpressure).
+    Исключение fn пробрасывается при выдаче соответствующего результата.
+    """
+    workers = max(1, int(workers))
+    if workers == 1:
+        for it in items:
+            yield fn(it)
+        return
+    window = max(workers, int(window))
+    pending: Deque[Future] = deque()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grab")
+    try:
+        source = iter(items)
+        for it in source:
+            pending.append(pool.submit(fn, it))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # потребитель мог прерваться — не ждём невыданные задачи
+        for fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=True)
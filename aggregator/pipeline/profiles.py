@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import yaml
+from lxml import etree  # type: ignore
+from lxml.cssselect import CSSSelector  # type: ignore
+
+PROFILES_YML = Path(__file__).resolve().parents[1] / "extract_profiles.yml"
+_KEYS = {"content", "image", "remove", "skip_trafilatura", "force_fetch_article"}
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Скомпилированный профиль домена: селекторы — готовые lxml XPath."""
+    domain: str
+    content: Optional[etree.XPath] = None
+    image: Optional[etree.XPath] = None
+    remove: Optional[etree.XPath] = None
+    skip_trafilatura: bool = False
+    force_fetch_article: bool = False
+
+
+def compile_selector(sel: Optional[str]) -> Optional[etree.XPath]:
+    """CSS -> XPath (CSSSelector — тоже XPath); строки с «/» или «(» — уже XPath."""
+    if not sel:
+        return None
+    sel = sel.strip()
+    if sel.startswith(("/", "(")):
+        return etree.XPath(sel)
+    return CSSSelector(sel)
+
+
+def _compile(domain: str, raw: Dict, base: Dict) -> Profile:
+    unknown = set(raw) - _KEYS
+    if unknown:
+        print(f"[WARN] extract_profiles: {domain}: unknown keys {sorted(unknown)}")
+    merged = {**base, **raw}
+    return Profile(
+        domain=domain,
+        content=compile_selector(merged.get("content")),
+        image=compile_selector(raw.get("image")),
+        remove=compile_selector(raw.get("remove")),
+        skip_trafilatura=bool(raw.get("skip_trafilatura")),
+        force_fetch_article=bool(raw.get("force_fetch_article")),
+    )
+
+
+class Profiles:
+    """Профили из YAML, собранные один раз на процесс; поиск по домену с кэшем."""
+
+    def __init__(self, data: Dict):
+        base = data.get("default") or {}
+        self.default = _compile("default", base, {})
+        self.by_domain: Dict[str, Profile] = {}
+        for dom, raw in (data.get("profiles") or {}).items():
+            dom = str(dom).lower().strip(".")
+            self.by_domain[dom] = _compile(dom, raw or {}, {"content": base.get("content")})
+        self.lookup = lru_cache(maxsize=1024)(self._lookup)
+
+    def _lookup(self, host: str) -> Profile:
+        labels = host.lower().split(".")
+        # от полного хоста к регистрируемому домену (два последних метки)
+        for i in range(0, max(1, len(labels) - 1)):
+            prof = self.by_domain.get(".".join(labels[i:]))
+            if prof is not None:
+                return prof
+        return self.default
+
+    def for_url(self, url: str) -> Profile:
+        host = (urlsplit(url).hostname or "")
+        return self.lookup(host)
+
+
+def load_profiles(path: Union[str, Path, None] = None) -> Profiles:
+    """EXTRACT_PROFILES=<file> переопределяет путь; нет файла — только default."""
+    path = Path(path or os.environ.get("EXTRACT_PROFILES") or PROFILES_YML)
+    data: Dict = {}
+    if path.exists():
+        data = yaml.safe_load(path.read_text("utf-8")) or {}
+    if not data.get("default"):
+        data["default"] = {"content": "article, .article, .post, .post-content, .entry-content, .content"}
+    return Profiles(data)
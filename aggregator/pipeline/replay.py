@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+from requests.structures import CaseInsensitiveDict  # type: ignore
+from requests.utils import get_encoding_from_headers  # type: ignore
+
+# Заголовки, которые после декодирования тела врут — не сохраняем
+_DROP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+_CONDITIONAL = ("If-None-Match", "If-Modified-Since")
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parents[1] / "fixtures" / "http"
+
+
+def fixture_key(method: str, url: str) -> str:
+    return hashlib.sha1(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+
+class FixtureAdapter(HTTPAdapter):
+    """
+    Транспорт requests с записью/воспроизведением ответов.
+      record — ходит в сеть (без условных заголовков, чтобы сохранить полное тело)
+               и кладёт каждый ответ в fixture_dir/<host>/<sha1>.json + .body
+      replay — отвечает только из фикстур, с фиксированной задержкой latency;
+               If-None-Match/If-Modified-Since обрабатываются как настоящий сервер (304).
+    Нет фикстуры в replay — ConnectionError, в сеть запрос не уходит.
+    Время записи лежит в fixture_dir/recorded_at — replay прогоняется «в тот момент».
+    """
+
+    def __init__(self, mode: str, fixture_dir: Union[str, Path], latency: float = 0.0, **kw: Any):
+        super().__init__(**kw)
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unknown fixture mode: {mode}")
+        self.mode = mode
+        self.fixture_dir = Path(fixture_dir)
+        self.latency = float(latency)
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self._lock = threading.Lock()
+
+    def _paths(self, method: str, url: str):
+        host = (urlsplit(url).netloc or "_").replace(":", "_")
+        key = fixture_key(method, url)
+        base = self.fixture_dir / host / key
+        return base.with_suffix(".json"), base.with_suffix(".body")
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.mode == "record":
+            for h in _CONDITIONAL:
+                request.headers.pop(h, None)
+            resp = super().send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+            self._record(request, resp)
+            return resp
+        return self._replay(request)
+
+    def _record(self, request, resp) -> None:
+        meta_path, body_path = self._paths(request.method, request.url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        body = resp.content or b""
+        meta = {
+            "method": request.method,
+            "url": request.url,
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS},
+        }
+        body_path.write_bytes(body)
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), "utf-8")
+        with self._lock:
+            if not self.stats["recorded"]:
+                (self.fixture_dir / "recorded_at").write_text(str(int(time.time())), "utf-8")
+            self.stats["recorded"] += 1
+
+    def recorded_at(self) -> Optional[float]:
+        """
+        Когда записаны фикстуры (секунды эпохи). Для фикстур без recorded_at —
+        самый поздний заголовок Date среди ответов; нет и его — None.
+        """
+        try:
+            return float((self.fixture_dir / "recorded_at").read_text("utf-8").strip())
+        except (OSError, ValueError):
+            pass
+        latest = None
+        for meta_path in self.fixture_dir.glob("*/*.json"):
+            try:
+                date = CaseInsensitiveDict(json.loads(meta_path.read_text("utf-8")).get("headers") or {}).get("Date")
+                ts = parsedate_to_datetime(date).timestamp() if date else None
+            except Exception:
+                continue
+            if ts and (latest is None or ts > latest):
+                latest = ts
+        return latest
+
+    def _replay(self, request) -> requests.Response:
+        meta_path, body_path = self._paths(request.method, request.url)
+        if self.latency:
+            time.sleep(self.latency)
+        if not meta_path.exists():
+            with self._lock:
+                self.stats["misses"] += 1
+            raise requests.ConnectionError(f"no fixture for {request.method} {request.url}", request=request)
+        with self._lock:
+            self.stats["hits"] += 1
+        meta = json.loads(meta_path.read_text("utf-8"))
+        headers = CaseInsensitiveDict(meta.get("headers") or {})
+        status = int(meta.get("status") or 200)
+        body = body_path.read_bytes() if body_path.exists() else b""
+
+        etag, lm = headers.get("ETag"), headers.get("Last-Modified")
+        inm, ims = request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")
+        if status == 200 and ((etag and inm == etag) or (lm and not inm and ims == lm)):
+            status, body = 304, b""
+
+        headers["Content-Length"] = str(len(body))
+        r = requests.Response()
+        r.status_code = status
+        r.reason = "Not Modified" if status == 304 else (meta.get("reason") or "")
+        r.headers = headers
+        r.url = request.url
+        r.request = request
+        r.encoding = get_encoding_from_headers(headers)
+        r.raw = io.BytesIO(body)
+        r._content = body
+        r._content_consumed = True
+        r.connection = self
+        return r
+
+
+def install(session: requests.Session, mode: str, fixture_dir: Union[str, Path, None] = None,
+            latency: float = 0.0, pool_size: int = 10) -> FixtureAdapter:
+    adapter = FixtureAdapter(mode, fixture_dir or DEFAULT_FIXTURES, latency,
+                             pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
+
+
+def install_from_env(session: requests.Session, pool_size: int = 10) -> Optional[FixtureAdapter]:
+    """
+    INGEST_HTTP_MODE=record|replay — включить запись/воспроизведение
+    INGEST_FIXTURES=<dir>           — каталог фикстур (по умолчанию aggregator/fixtures/http)
+    INGEST_REPLAY_LATENCY_MS=<ms>   — искусственная задержка каждого ответа в replay
+    """
+    mode = (os.environ.get("INGEST_HTTP_MODE") or "").strip().lower()
+    if not mode:
+        return None
+    try:
+        latency = float(os.environ.get("INGEST_REPLAY_LATENCY_MS") or 0) / 1000.0
+    except ValueError:
+        latency = 0.0
+    return install(session, mode, os.environ.get("INGEST_FIXTURES") or None, latency, pool_size)
+
+
+def summary(adapter: Optional[FixtureAdapter]) -> str:
+    if adapter is None:
+        return "live"
+    s: Dict[str, int] = adapter.stats
+    return f"{adapter.mode} {adapter.fixture_dir}: hits {s['hits']}, misses {s['misses']}, recorded {s['recorded']}"
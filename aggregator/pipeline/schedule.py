@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import statistics
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+from . import clock
+from .export import atomic_write_text
+
+
+class PollSchedule:
+    """
+    Адаптивное расписание опроса лент.
+    По датам записей ленты оцениваем типичный интервал публикаций (медиана
+    промежутков) и опрашиваем источник примерно дважды за этот интервал,
+    но не чаще `floor` и не реже `ceiling` секунд.
+    Формат файла: {url: {"name", "last_fetch", "stamps": [epoch, ...]}}.
+    """
+
+    def __init__(self, path: Union[str, Path], floor: float = 3 * 3600, ceiling: float = 48 * 3600,
+                 factor: float = 0.5, keep: int = 30, slack: float = 15 * 60):
+        self.path = Path(path)
+        self.floor = float(floor)
+        self.ceiling = max(float(ceiling), self.floor)
+        self.factor = float(factor)
+        self.keep = int(keep)
+        # запуск по cron может прийти на пару минут раньше — не откладываем из-за этого на целый цикл
+        self.slack = float(slack)
+        self.data: Dict[str, Dict[str, Any]] = {}
+        self.skipped: list[str] = []
+        self._lock = threading.Lock()
+        try:
+            if self.path.exists():
+                raw = json.loads(self.path.read_text("utf-8"))
+                if isinstance(raw, dict):
+                    self.data = raw
+        except Exception:
+            self.data = {}
+
+    def interval(self, url: str) -> float:
+        stamps = sorted(set((self.data.get(url) or {}).get("stamps") or []), reverse=True)
+        if len(stamps) < 2:
+            return self.floor
+        gap = statistics.median(a - b for a, b in zip(stamps, stamps[1:]))
+        return min(self.ceiling, max(self.floor, gap * self.factor))
+
+    def next_due(self, url: str) -> float:
+        rec = self.data.get(url) or {}
+        return float(rec.get("last_fetch") or 0) + self.interval(url)
+
+    def due(self, url: str, name: str = "", now: Optional[float] = None) -> bool:
+        now = clock.now() if now is None else now
+        if now + self.slack >= self.next_due(url):
+            return True
+        with self._lock:
+            self.skipped.append(name or url)
+        return False
+
+    def observe(self, url: str, name: str, stamps: Iterable[float], now: Optional[float] = None) -> None:
+        """Успешный опрос: запоминаем время и самые свежие даты записей ленты."""
+        now = clock.now() if now is None else now
+        with self._lock:
+            rec = dict(self.data.get(url) or {})
+            merged = set(rec.get("stamps") or [])
+            merged.update(int(s) for s in stamps if s and s <= now + 86400)
+            rec.update({"name": name, "last_fetch": now, "stamps": sorted(merged, reverse=True)[: self.keep]})
+            self.data[url] = rec
+
+    def summary(self) -> str:
+        hours = sorted(f"{r.get('name') or u}:{self.interval(u) / 3600:.0f}h" for u, r in self.data.items())
+        return f"not due: {len(self.skipped)} {sorted(self.skipped)} | intervals: {hours}"
+
+    def save(self) -> None:
+        atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=2, sort_keys=True))
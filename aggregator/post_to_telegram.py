@@ -7,8 +7,13 @@ import urllib.parse
 import urllib.request
 import re
 import html as html_lib
+import time
+
+from pipeline.canon import UrlIndex, item_key
 
 NEWS_PATH = "frontend/data/news.json"
+# общий индекс URL (пишет aggregator/main.py); отправленное отмечается полем "tg"
+URL_INDEX_PATH = "frontend/data/url_index.json"
 
 TAG_RE = re.compile(r"<[^>]+>")
 
@@ -70,19 +75,27 @@ def load_previous():
 def make_key(item):
     """
     Уникальный ключ новости, чтобы понять — новая она или нет.
-    Пробуем по id/url/link, если нет — по title+source.
+    Канонический URL (pipeline/canon.py — тот же, что у ингеста и дайджеста),
+    если ссылки нет — title+source.
     """
-    for key in ("id", "url", "link", "guid"):
-        v = item.get(key)
-        if v:
-            return str(v)
+    return item_key(item)
+
+
+def sort_by_date(unique):
+
+    def get_date(it):
+        for key in ("published_at", "published", "date", "created_at"):
+            if key in it:
+                return str(it[key])
+        return ""
 
-    title = (item.get("title") or "").strip()
-    src = item.get("source") or item.get("source_name") or ""
-    return f"{title}::{src}"
+    # сортируем по дате, чтобы постить в нормальном порядке (от старых к новым)
+    unique.sort(key=get_date)
+    return unique
 
 
 def get_new_items(prev, current):
+    """Фолбэк без индекса: новое — то, чего не было в прошлом news.json из git."""
     # Специальный режим: TELEGRAM_FORCE_ALL=1 → считаем все новости новыми
     force_all = os.environ.get("TELEGRAM_FORCE_ALL") == "1"
     if force_all:
@@ -91,17 +104,27 @@ def get_new_items(prev, current):
     else:
         prev_keys = {make_key(i) for i in prev}
 
-    unique = [i for i in current if make_key(i) not in prev_keys]
+    return sort_by_date([i for i in current if make_key(i) not in prev_keys])
 
-    def get_date(it):
-        for key in ("published_at", "published", "date", "created_at"):
-            if key in it:
-                return str(it[key])
-        return ""
 
-    # сортируем по дате, чтобы постить в нормальном порядке (от старых к новым)
-    unique.sort(key=get_date)
-    return unique
+def get_unposted_items(index, current):
+    """
+    Новое — записи, которых индекс ещё не видел или не отмечал как отправленные.
+    Смотрим только ключи текущего файла, прошлый news.json не нужен.
+    """
+    force_all = os.environ.get("TELEGRAM_FORCE_ALL") == "1"
+    if force_all:
+        print("TELEGRAM_FORCE_ALL=1 → считаем все новости новыми.", file=sys.stderr)
+    unique, seen = [], set()
+    for it in current:
+        key = make_key(it)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        rec = index.get(key)
+        if force_all or rec is None or "tg" not in rec:
+            unique.append(it)
+    return sort_by_date(unique)
 
 
 def build_site_url(site_base: str, idx: int) -> str:
@@ -216,13 +239,25 @@ def main():
         except Exception:
             pass
 
-    prev = load_previous()
-    new_items = get_new_items(prev, current)
+    index = UrlIndex(URL_INDEX_PATH)
+    if index.loaded:
+        new_items = get_unposted_items(index, current)
+    else:
+        print(f"{URL_INDEX_PATH} не найден — сравниваем с прошлым news.json из git.", file=sys.stderr)
+        new_items = get_new_items(load_previous(), current)
 
     if not new_items:
         print("Новых новостей для Telegram нет.", file=sys.stderr)
         return
 
+    # как и раньше, всё новое этого прогона больше не считается новым (даже сверх лимита)
+    now = time.time()
+    if index.loaded:
+        for item in new_items:
+            key = make_key(item)
+            index.add(key, now=now)
+            index.mark(key, "tg", now)
+
     # берём только последние N, чтобы не заспамить канал
     new_items = new_items[-max_posts:]
 
@@ -244,6 +279,9 @@ def main():
             errors += 1
             print(f"Ошибка отправки в Telegram: {e}", file=sys.stderr)
 
+    if index.loaded:
+        index.save()
+
     if errors:
         print(f"Готово, но с {errors} ошибк(ами).", file=sys.stderr)
     else:
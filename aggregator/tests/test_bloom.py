@@ -0,0 +1,28 @@
+from pipeline.bloom import ScalableBloomFilter, SeenFilter
+
+def test_scalable_bloom_grows_and_keeps_error():
+    f = ScalableBloomFilter(error=1e-3, initial=1000)
+    # ложное срабатывание при добавлении тоже возможно — это и есть error
+    added = sum(f.add(f"u:example.com/{i}") for i in range(5000))
+    assert added > 4990
+    assert not f.add("u:example.com/42")
+    assert len(f) == added and len(f.filters) == 3
+    assert all(f"u:example.com/{i}" in f for i in range(5000))
+    false_hits = sum(f"x:{i}" in f for i in range(20000))
+    assert false_hits / 20000 < 2e-3
+
+    again = ScalableBloomFilter.from_bytes(f.to_bytes())
+    assert len(again) == added and "u:example.com/4999" in again
+
+def test_seen_filter_roundtrip(tmp_path):
+    seen = SeenFilter(tmp_path / "seen.bloom")
+    assert not seen.loaded
+    seen.seed([{"link": "https://www.example.com/a/?utm_source=x"}], {"guid-b": "https://example.com/b"})
+    seen.save()
+
+    seen = SeenFilter(tmp_path / "seen.bloom")
+    assert seen.loaded
+    assert seen.seen("", "http://example.com/a")
+    assert seen.seen("guid-b", "")
+    assert not seen.seen("guid-c", "https://example.com/c")
+    assert seen.skipped == 2
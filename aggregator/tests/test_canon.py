@@ -0,0 +1,30 @@
+from pipeline.canon import UrlIndex, canonical_url, host_key, item_key, url_key
+
+def test_canonical_url_and_key():
+    raw = "HTTPS://WWW.Example.com:443/news/a/?utm_source=tg&b=2&a=1&ref=x&referrer=y#top"
+    assert canonical_url(raw) == "https://www.example.com/news/a?a=1&b=2&referrer=y"
+    # схема и www. для ключа не важны
+    assert url_key(raw) == url_key("http://example.com/news/a?b=2&a=1&referrer=y") == "example.com/news/a?a=1&b=2&referrer=y"
+    assert item_key({"title": "T", "source": "s"}) == "T::s"
+    assert item_key({"link": "https://example.com/x/", "title": "T"}) == "example.com/x"
+
+def test_url_key_is_idempotent():
+    for x in ("https://www.trucknews.com/a/b?utm_source=x", "//www.example.com/a/", "HTTP://EXAMPLE.com:80/?b=1"):
+        assert url_key(url_key(x)) == url_key(x)
+        assert host_key(url_key(x)) == host_key(x)
+    assert host_key("https://www.trucknews.com/a/b") == "trucknews.com"
+
+def test_url_index_roundtrip(tmp_path):
+    path = tmp_path / "url_index.json"
+    idx = UrlIndex(path)
+    assert not idx.loaded
+    assert idx.seed([{"link": "https://example.com/a"}]) == 1
+    assert idx.add(url_key("https://www.example.com/a/")) is False
+    assert idx.add("example.com/b", now=100) is True
+    idx.mark("example.com/b", "tg", 200)
+    idx.save()
+
+    again = UrlIndex(path)
+    assert again.loaded
+    assert again.get("example.com/a")["tg"] == 0
+    assert again.get("example.com/b") == {"id": again.get("example.com/b")["id"], "first_seen": 100, "tg": 200}
@@ -1,4 +1,4 @@
-from pipeline.classify import build_classifier
+from pipeline.classify import Classifier, build_classifier
 import yaml
 
 def test_classifier_basic():
@@ -10,3 +10,17 @@ classify:
     clf = build_classifier(rules)
     assert clf("Премьера новой модели", "") == "Новые модели"
     assert clf("Отраслевая выставка прошла", "") == "Выставки"
+
+def test_classifier_counts_all_labels():
+    rules = yaml.safe_load("""
+classify:
+  "Рынок": ["рынок", "продажи"]
+  "Дилеры": ["дилер", "дилерская сеть", "центр продаж"]
+  "Техника": ["тягач\\\\w*"]
+    """)
+    clf = Classifier(rules)
+    # «центр продажи» — совпадения перекрываются; «дилерская сеть» начинается с «дилер»
+    assert clf.counts("Дилерская сеть открыла центр продажи", "Рынок ТЯГАЧЕЙ растёт") == \
+        {"Рынок": 2, "Дилеры": 2, "Техника": 1}
+    assert clf.first("Новый дилер", "") == "Дилеры"
+    assert clf.classify_items([{"title": "Рынок"}, {"title": "Погода", "summary": None}]) == [{"Рынок": 1}, {}]
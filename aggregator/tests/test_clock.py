@@ -0,0 +1,18 @@
+from pipeline import clock
+from pipeline.health import SourceHealth
+
+def test_frozen_clock_makes_state_repeatable(tmp_path):
+    assert clock.parse("2024-05-01T06:00:00Z") == clock.parse("1714543200") == 1714543200.0
+    assert clock.parse("") is None and clock.parse("вчера") is None
+    runs = []
+    try:
+        for _ in range(2):
+            clock.freeze(1714543200)
+            h = SourceHealth(tmp_path / "h.json", threshold=1)
+            h.failure("https://a.example/rss", "a", "Timeout")
+            runs.append(h.data)
+        assert clock.now() == 1714543200
+    finally:
+        clock.freeze(None)
+    assert runs[0] == runs[1]
+    assert runs[0]["https://a.example/rss"]["open_until"] > 1714543200
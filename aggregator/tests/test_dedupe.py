@@ -0,0 +1,9 @@
+from pipeline.dedupe import dedupe
+
+def test_same_title_same_host_within_72h_dropped():
+    items = [
+        {"url": "https://www.trucknews.com/a?utm_source=x", "title": "Krone opens plant", "published_at": "2024-05-01T10:00:00Z"},
+        {"url": "https://trucknews.com/b", "title": "Krone opens plant", "published_at": "2024-05-01T12:00:00Z"},
+        {"url": "https://other.com/c", "title": "Krone opens plant", "published_at": "2024-05-01T12:00:00Z"},
+    ]
+    assert [it["url"] for it in dedupe(items)] == [items[0]["url"], items[2]["url"]]
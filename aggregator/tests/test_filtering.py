@@ -0,0 +1,36 @@
+from pipeline.filtering import ExcludeRules, Prefilter, should_exclude
+
+def test_exclude_modes_and_domains():
+    rules = ExcludeRules.from_rules({"exclude": {
+        "keywords": ["лесовоз", "c++"],
+        "prefixes": ["зерновоз"],
+        "substrings": ["iphone"],
+        "domains": ["tass.ru"],
+    }})
+    assert rules.match_text("Новый ЛЕСОВОЗ на выставке") == "лесовоз"
+    assert rules.match_text("лесовозный прицеп") is None
+    assert rules.match_text("Зерновозы КАМАЗ") == "зерновоз"
+    assert rules.match_text("курс по C++ для инженеров") == "c++"
+    assert rules.match_text("новый myiphone") == "iphone"
+
+    items = [
+        {"link": "https://www.tass.ru/ekonomika/1", "title": "Рынок"},
+        {"link": "https://nottass.ru/1", "title": "Рынок тягачей"},
+        {"link": "https://example.com/2", "title": "Лесовоз &amp; панелевоз", "summary": ""},
+    ]
+    kept, dropped = rules.filter(items)
+    assert kept == [items[1]]
+    assert [why for _, why in dropped] == ["domain:tass.ru", "keyword:лесовоз"]
+
+def test_should_exclude_keeps_old_interface():
+    assert should_exclude({"title": "Балковоз", "summary": ""}, {"keywords": ["балковоз"]})
+    assert not should_exclude({"title": "Балковозы", "summary": ""}, {"keywords": ["балковоз"]})
+
+def test_prefilter_counts_saved_requests():
+    pre = Prefilter(ExcludeRules(keywords=["лесовоз"], domains=["tass.ru"]))
+    assert pre.feed_blocked("https://tass.ru/rss/v2.xml") == "tass.ru"
+    assert pre.entry_reason("https://example.com/a", "Новый лесовоз", "", requests=1) == "keyword:лесовоз"
+    assert pre.entry_reason("https://example.com/b", "Рынок тягачей", "", requests=1) is None
+    assert pre.stats == {"feeds": 1, "entries": 1, "domain": 1, "keyword": 1, "requests_saved": 2}
+    assert pre.summary().endswith("requests saved: 2")
+    assert "requests saved" not in pre.summary(requests=False)
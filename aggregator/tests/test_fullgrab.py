@@ -0,0 +1,74 @@
+from pipeline.fullgrab import extract_page
+
+PAGE = ("<html><head><meta property='og:image' content='/lead.jpg'></head><body>"
+        "<nav><a href='/'>Главная</a></nav><div class='post-content'>"
+        + "".join(f"<p>Абзац {i}: полуприцеп тягач рынок выставка дилер премьера.</p>" for i in range(40))
+        + "</div><script>var a = 1;</script></body></html>")
+
+def test_cpu_deadline_falls_back_to_selectors():
+    html, img = extract_page(PAGE, "https://example.com/news/1", cpu_limit=None)
+    assert img == "https://example.com/lead.jpg"
+    assert "Абзац 39" in html
+
+    # лимит, в который trafilatura не уложится: текст берётся по селектору
+    html, img = extract_page(PAGE, "https://example.com/news/1", cpu_limit=1e-6)
+    assert img == "https://example.com/lead.jpg"
+    assert html.startswith("<p>Абзац 0:") and "var a" not in html and "Главная" not in html
+
+def test_pool_wall_limit_falls_back_to_selectors(monkeypatch):
+    from concurrent.futures import Future
+    import pipeline.fullgrab as fg
+
+    class StuckPool:
+        def submit(self, *args):
+            return Future()  # воркер так и не ответил
+
+    monkeypatch.setattr(fg, "_pool", lambda: StuckPool())
+    monkeypatch.setattr(fg, "WALL_LIMIT", 0.01)
+    html, img = fg._extract(PAGE, "https://example.com/news/1")
+    assert img == "https://example.com/lead.jpg"
+    assert html.startswith("<p>Абзац 0:") and "Главная" not in html
+
+class _Stream:
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+
+    def __init__(self, url, body):
+        self.url, self.body, self.read = url, body.encode("utf-8"), 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            self.read = i + size
+            yield self.body[i:i + size]
+
+def test_grab_image_waits_for_profile_selector(monkeypatch):
+    import pipeline.fullgrab as fg
+    from pipeline.profiles import Profiles
+
+    filler = "<p>" + "текст " * 4000 + "</p>"
+    body = ("<html><head><meta property='og:image' content='/og.jpg'></head><body>"
+            f"<img src='/logo.png'>{filler}<figure class='lead'><img src='/lead.jpg'></figure>{filler}</body></html>")
+    monkeypatch.setattr(fg, "PROFILES", Profiles({"profiles": {"example.com": {"image": "figure.lead img"}}}))
+    streams = []
+
+    class HTTP:
+        @staticmethod
+        def get(url, **kw):
+            streams.append(_Stream(url, body))
+            return streams[-1]
+
+    monkeypatch.setattr(fg, "HTTP", HTTP)
+    # у хоста свой селектор: og и логотип не останавливают чтение, <figure class="lead"> — да
+    assert fg.grab_image("https://example.com/n/1") == "https://example.com/lead.jpg"
+    assert streams[-1].read < len(streams[-1].body)
+    # без профиля — как раньше: og:image сразу после </head>
+    assert fg.grab_image("https://other.com/n/1") == "https://other.com/og.jpg"
+    assert streams[-1].read <= 16 * 1024
@@ -0,0 +1,39 @@
+from pipeline.gazetteer import Gazetteer, default_gazetteer
+
+def test_words_stems_and_prefix_stems():
+    g = Gazetteer({
+        "brands": {"Kögel": ["kögel", "koegel", "кёгель"], "МАЗ": ["маз", "маза"]},
+        "equipment": {"полуприцеп": ["полуприцеп*"], "прицеп": ["прицеп*"], "цистерна": ["цистерн*", "автоцистерн*"]},
+    })
+    assert g.match("Новые полуприцепы Koegel") == ["полуприцеп", "Kögel"]
+    assert g.match("Кегель показал автоцистерну") == ["Kögel", "цистерна"]
+    # основа не ловит середину слова, целое слово — не ловит начало другого
+    assert g.match("Мазут для полуприцепа") == ["полуприцеп"]
+    assert g.match("прицепы МАЗа") == ["прицеп", "МАЗ"]
+
+    items = [{"title": "Прицеп", "summary": "<p>цистерны</p>", "tags": ["выставка"]}, {"title": "Рынок"}]
+    assert g.tag_items(items) == 1
+    assert items[0]["tags"] == ["выставка", "прицеп", "цистерна"]
+    assert "tags" not in items[1]
+
+def test_default_gazetteer_file():
+    tags = default_gazetteer().match("Schmitz Cargobull и Krone: седельные тягачи и полуприцепы-рефрижераторы")
+    assert tags == ["Schmitz Cargobull", "Krone", "тягач", "полуприцеп", "рефрижератор"]
+
+def test_ordinary_words_are_not_brands():
+    g = default_gazetteer()
+    assert g.match("The driver sat in the cab; фотон и ман в физике") == []
+    assert g.match("MAN TGX and SAT trailers; Фотон Моторс") == ["MAN", "SAT", "Foton"]
+
+def test_version_follows_variants():
+    a = Gazetteer({"brands": {"МАЗ": ["маз"]}})
+    assert a.version == Gazetteer({"other": {"МАЗ": ["МАЗ"]}}).version
+    assert a.version != Gazetteer({"brands": {"МАЗ": ["маз", "maz"]}}).version
+
+def test_default_gazetteer_reads_env(tmp_path, monkeypatch):
+    import pipeline.gazetteer as gz
+    path = tmp_path / "g.yml"
+    path.write_text('brands:\n  "Тест": ["тестовоз*"]\n', "utf-8")
+    monkeypatch.setenv("GAZETTEER", str(path))
+    monkeypatch.setattr(gz, "_DEFAULT", None)
+    assert gz.default_gazetteer().match("Новые тестовозы") == ["Тест"]
@@ -0,0 +1,39 @@
+import os
+
+from pipeline.grabcache import GrabCache
+
+def test_hit_ttl_and_lru_eviction(tmp_path):
+    cache = GrabCache(tmp_path, ttl=3600, budget=10 ** 6)
+    cache.put("https://Example.com/a/", "<p>a</p>", "https://example.com/a.jpg")
+    # тот же канонический URL: регистр хоста, слэш и фрагмент не важны
+    assert cache.get("https://example.com/a#top") == ("<p>a</p>", "https://example.com/a.jpg")
+    assert cache.get("https://example.com/b") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+    # бюджет на две записи: при третьей вытесняется давно не читанная
+    size = os.path.getsize(next(tmp_path.glob("*.json")))
+    cache = GrabCache(tmp_path, ttl=3600, budget=2 * size + 10)
+    cache.put("https://example.com/b", "<p>b</p>", "https://example.com/a.jpg")
+    assert cache.get("https://example.com/a") is not None
+    cache.put("https://example.com/c", "<p>c</p>", "https://example.com/a.jpg")
+    assert cache.stats["evicted"] == 1
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/a") is not None
+
+    stale = GrabCache(tmp_path, ttl=-1)
+    assert stale.get("https://example.com/a") is None
+    assert stale.stats["expired"] == 1
+
+def test_negative_results_cached_with_short_ttl(tmp_path):
+    cache = GrabCache(tmp_path, ttl=3600, neg_ttl=3600)
+    cache.put("https://example.com/noimg", None, None, negative="image")
+    cache.put("https://example.com/broken", None, None, negative="page")
+    # «картинки нет» — ответ для grab_image, но не для полного текста
+    assert cache.get("https://example.com/noimg", need_html=False) == (None, None)
+    assert cache.get("https://example.com/noimg") is None
+    assert cache.get("https://example.com/broken") == (None, None)
+    assert cache.stats["negative"] == 2
+
+    short = GrabCache(tmp_path, ttl=3600, neg_ttl=-1)
+    assert short.get("https://example.com/broken") is None
+    assert short.stats["expired"] == 1
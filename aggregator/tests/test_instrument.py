@@ -0,0 +1,16 @@
+from pipeline.instrument import Stages
+
+def test_disabled_stages_record_nothing():
+    off = Stages()
+    with off.stage("sort") as st:
+        st["items"] = 3
+    with off.timed("net") as st:
+        st["bytes"] = 10
+    off.add("parse", 1.0)
+    assert off.data == {} and off.order == [] and off.lines() == []
+
+    on = Stages(enabled=True)
+    with on.stage("sort") as st:
+        st["items"] = 3
+    on.add("sort", items=2)
+    assert on.order == ["sort"] and on.data["sort"]["items"] == 5 and on.data["sort"]["calls"] == 2
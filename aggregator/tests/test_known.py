@@ -0,0 +1,11 @@
+from pipeline.known import KnownIndex
+
+def test_claim_is_check_and_remember(tmp_path):
+    known = KnownIndex(tmp_path / "known.json")
+    known.seed([{"link": "https://example.com/old"}])
+    assert not known.claim("", "http://www.example.com/old/")
+    assert known.claim("g1", "https://example.com/a")
+    # та же запись из другой ленты: по GUID и по ссылке
+    assert not known.claim("g1", "https://mirror.example.org/a")
+    assert not known.claim("g2", "https://example.com/a?utm_source=rss")
+    assert known.is_known("g1", "") and known.guids == {"g1": "https://example.com/a"}
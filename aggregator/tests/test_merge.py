@@ -0,0 +1,21 @@
+from pipeline.merge import MIN_TS, merge_sorted, parse_ts
+
+def test_merge_matches_full_sort():
+    existing = [
+        {"link": "a", "published_at": "2026-08-21T08:00:00+00:00"},
+        {"link": "b", "published_at": "2026-08-20T08:00:00+00:00"},
+        {"link": "c", "published_at": None},
+    ]
+    fresh = [
+        {"link": "d", "published_at": None},
+        {"link": "e", "published_at": "2026-08-20T08:00:00+00:00"},
+        {"link": "f", "published_at": "2026-08-22T08:00:00Z"},
+    ]
+    merged = merge_sorted(fresh, existing)
+    # при равных датах свежие идут раньше, записи без даты — в конце
+    assert [it["link"] for it in merged] == ["f", "a", "e", "b", "d", "c"]
+
+def test_parse_ts_fallback():
+    assert parse_ts(None) == MIN_TS
+    assert parse_ts("not a date") == MIN_TS
+    assert parse_ts("2026-08-21T08:00:00") == parse_ts("2026-08-21T08:00:00+00:00")
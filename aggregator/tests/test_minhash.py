@@ -0,0 +1,79 @@
+from pipeline.dedupe import assign_stories, drop_near_duplicates, seed_near_index
+from pipeline.minhash import NearDupIndex, item_text, signature, similarity
+
+RELEASE = ("Krone представила новый полуприцеп Profi Liner с усиленной рамой и "
+           "облегчённой осью. Серийный выпуск начнётся весной, первые машины получат клиенты в Европе.")
+
+def _item(link, title, summary=RELEASE):
+    return {"link": link, "title": title, "summary": summary}
+
+def test_cross_source_near_duplicate_dropped(tmp_path):
+    index = NearDupIndex(tmp_path / "near.json", threshold=0.6)
+    items = [
+        _item("https://globaltrailermag.com/krone-profi-liner", "Krone представила новый Profi Liner"),
+        _item("https://trucknews.com/krone/", "Krone показала новый Profi Liner"),
+        # тот же текст на том же сайте — не перепечатка, оставляем
+        _item("https://globaltrailermag.com/krone-profi-liner-2", "Krone представила новый Profi Liner"),
+        _item("https://trucknews.com/other", "Рынок тягачей в сентябре", "Продажи седельных тягачей выросли на 12% к августу."),
+    ]
+    kept, dropped = drop_near_duplicates(items, index)
+    assert [it["link"] for it in dropped] == ["https://trucknews.com/krone/"]
+    assert len(kept) == 3
+
+    index.save()
+    again = NearDupIndex(tmp_path / "near.json", threshold=0.6)
+    assert again.loaded and len(again) == 3
+    kept, dropped = drop_near_duplicates([_item("https://pressebox.de/krone", "Krone: новый Profi Liner")], again)
+    assert not kept and len(dropped) == 1
+
+def test_signature_similarity():
+    a = signature(item_text(_item("", "Krone представила новый Profi Liner")))
+    b = signature(item_text(_item("", "Krone показала новый Profi Liner")))
+    c = signature(item_text(_item("", "Рынок тягачей", "Продажи седельных тягачей выросли на 12% к августу.")))
+    assert similarity(a, a) == 1.0
+    assert similarity(a, b) > 0.6 > similarity(a, c)
+    assert signature("коротко") is None
+
+def test_stories_are_incremental(tmp_path):
+    index = NearDupIndex(tmp_path / "near.json")
+    first = [
+        _item("https://globaltrailermag.com/krone-profi-liner", "Krone представила новый Profi Liner"),
+        _item("https://trucknews.com/market", "Рынок тягачей в сентябре", "Продажи седельных тягачей выросли на 12% к августу."),
+    ]
+    kept, _ = drop_near_duplicates(first, index)
+    assert assign_stories(kept, index) == 0
+    assert first[0]["story_rep"] == "https://globaltrailermag.com/krone-profi-liner"
+    assert first[0]["story_id"] != first[1]["story_id"]
+    index.save()
+
+    # новый прогон: связанная публикация попадает в уже существующий сюжет
+    index = NearDupIndex(tmp_path / "near.json")
+    related = _item("https://pressebox.de/krone", "Krone Profi Liner: серийный выпуск весной",
+                    "Полуприцеп Profi Liner с усиленной рамой Krone начнёт выпускать весной, "
+                    "первые машины получат клиенты в Европе.")
+    kept, dropped = drop_near_duplicates([related], index)
+    assert kept and not dropped
+    assert assign_stories(kept, index) == 1
+    assert related["story_id"] == first[0]["story_id"]
+    assert related["story_rep"] == first[0]["link"]
+
+def test_seeding_leaves_archive_records_alone(tmp_path):
+    archive = [_item("https://globaltrailermag.com/krone-profi-liner", "Krone представила новый Profi Liner")]
+    archive[0]["published_at"] = "2024-05-01T10:00:00+00:00"
+    index = NearDupIndex(tmp_path / "near.json")
+    assert seed_near_index(archive, index, now=1714557600) == 1
+    assert "story_id" not in archive[0] and "story_rep" not in archive[0]
+    assert len(index.stories) == 1
+
+def test_joining_stamps_archive_representative(tmp_path):
+    archive = [_item("https://globaltrailermag.com/krone-profi-liner", "Krone представила новый Profi Liner")]
+    archive[0]["published_at"] = "2024-05-01T10:00:00+00:00"
+    index = NearDupIndex(tmp_path / "near.json")
+    seed_near_index(archive, index, now=1714557600)
+    related = _item("https://pressebox.de/krone", "Krone Profi Liner: серийный выпуск весной",
+                    "Полуприцеп Profi Liner с усиленной рамой Krone начнёт выпускать весной, "
+                    "первые машины получат клиенты в Европе.")
+    kept, _ = drop_near_duplicates([related], index)
+    assert assign_stories(kept, index, archive=archive) == 1
+    assert archive[0]["story_id"] == related["story_id"]
+    assert archive[0]["story_rep"] == related["story_rep"] == archive[0]["link"]
@@ -0,0 +1,29 @@
+import random
+import threading
+import time
+
+from pipeline.ordered import ordered_map
+
+def test_ordered_map_keeps_order_and_window():
+    lock = threading.Lock()
+    taken = {"n": 0, "done": 0, "max_ahead": 0}
+
+    def source():
+        for i in range(100):
+            with lock:
+                taken["n"] += 1
+                taken["max_ahead"] = max(taken["max_ahead"], taken["n"] - taken["done"])
+            yield i
+
+    def work(i):
+        time.sleep(random.random() / 500)
+        return i * i
+
+    out = []
+    for r in ordered_map(work, source(), workers=4, window=8):
+        out.append(r)
+        with lock:
+            taken["done"] += 1
+    assert out == [i * i for i in range(100)]
+    # вход не вычитывается дальше окна
+    assert taken["max_ahead"] <= 8
@@ -0,0 +1,22 @@
+from pipeline.profiles import Profiles, load_profiles
+from lxml.html import document_fromstring
+
+def test_lookup_walks_up_to_registrable_domain():
+    profiles = load_profiles()
+    assert profiles.for_url("https://www.zr.ru/news/1").domain == "zr.ru"
+    assert profiles.for_url("https://m.news.zr.ru/x").force_fetch_article
+    assert profiles.for_url("https://grozovy.ru/a").domain == "grozovy.ru"
+    assert profiles.for_url("https://ru/").domain == "default"
+    assert profiles.for_url("https://notzr.ru/a").domain == "default"
+
+def test_selectors_compiled_css_and_xpath():
+    profiles = Profiles({
+        "default": {"content": "article"},
+        "profiles": {"example.com": {"image": "//figure/img", "remove": ".related, aside", "skip_trafilatura": True}},
+    })
+    prof = profiles.for_url("https://example.com/n/1")
+    doc = document_fromstring("<html><body><article><figure><img src='/a.jpg'></figure>"
+                              "<div class='related'>x</div><aside>y</aside></article></body></html>")
+    assert prof.skip_trafilatura and prof.content(doc)[0].tag == "article"
+    assert [n.get("src") for n in prof.image(doc)] == ["/a.jpg"]
+    assert len(prof.remove(doc)) == 2
@@ -7,6 +7,8 @@ from langdetect import detect
 import argostranslate.package
 import argostranslate.translate
 
+from pipeline.export import pretty_from_env, save_news
+
 
 NEWS_PATH = os.getenv("NEWS_PATH", "frontend/data/news.json")
 
@@ -122,7 +124,8 @@ def main():
             item["summary"] = new_summary
             changed += 1
 
-    news_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    # тем же атомарным писателем, что и агрегатор: формат и sha256 в news_meta.json согласованы
+    save_news(data, news_file, news_file.with_name("news_meta.json"), pretty=pretty_from_env())
     print(f"OK: обновлено полей перевода: {changed}")
 
 
@@ -6,7 +6,9 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 import requests, feedparser, yaml  # pip install requests feedparser pyyaml
 
-BLOCKED_DOMAINS = {"tass.ru", "www.tass.ru"}
+# заблокированные домены — exclude.domains в aggregator/rules.yml (вместе с www.)
+_EXCLUDE = (yaml.safe_load((Path(__file__).resolve().parent / "aggregator" / "rules.yml").read_text("utf-8")) or {}).get("exclude") or {}
+BLOCKED_DOMAINS = {d for dom in (_EXCLUDE.get("domains") or []) for d in (dom, "www." + dom)}
 
 # ... там где у вас формируется result / all_items
 result = [it for it in result if it.get("domain") not in BLOCKED_DOMAINS]
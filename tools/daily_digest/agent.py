@@ -1,18 +1,27 @@
 import os
+import sys
 import json
 import random
 import html
+import time
 from pathlib import Path
 from datetime import datetime, timezone
 
 import requests
 from dateutil import parser as dtparser
 
+# общий канонизатор ссылок ингеста (aggregator/pipeline/canon.py, без внешних зависимостей)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "aggregator"))
+from pipeline.canon import UrlIndex, url_key  # noqa: E402
+from pipeline.filtering import ExcludeRules  # noqa: E402
+
 
 # --- ENV ---
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "").strip()
 NEWS_JSON_PATH = os.getenv("NEWS_JSON_PATH", "frontend/data/news.json").strip()
+# общий индекс URL (пишет aggregator/main.py); взятое в дайджест отмечается полем "digest"
+URL_INDEX_PATH = os.getenv("URL_INDEX_PATH", "frontend/data/url_index.json").strip()
 
 # Сколько новостей в дайджесте (3–5). По умолчанию 5.
 PICK_N = int(os.getenv("DIGEST_PICK_N", "5"))
@@ -25,6 +34,8 @@ STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 # Мягкий бан-лист "мусора"
 BLOCK_WORDS = ["porsche", "lamborghini", "audi", "кроссовер", "внедорожник", "iphone", "смартфон"]
+# тот же движок, что у ингеста (pipeline/filtering.py); подстроки — как раньше `w in title.lower()`
+BLOCKED = ExcludeRules(substrings=BLOCK_WORDS)
 
 
 # ----------------------------
@@ -177,8 +188,10 @@ def pick_items(news: list[dict], used_urls: set[str]) -> list[dict]:
     Всегда стараемся выбрать PICK_N новостей без темы.
     1) Сначала берём "новые" (не в used_urls) и не из BLOCK_WORDS
     2) Если таких < 3 — разрешаем повтор (иначе канал умрёт), но всё равно баним BLOCK_WORDS
+    used_urls — ключи url_key; одна статья под разными ссылками берётся один раз.
     """
     candidates: list[dict] = []
+    seen: set[str] = set()
 
     for it in news:
         if not isinstance(it, dict):
@@ -188,18 +201,20 @@ def pick_items(news: list[dict], used_urls: set[str]) -> list[dict]:
         if not url or not title:
             continue
 
-        title_l = title.lower()
-        if any(w in title_l for w in BLOCK_WORDS):
+        if BLOCKED.match_text(title):
             continue
 
-        if url in used_urls:
+        key = url_key(url)
+        if key in used_urls or key in seen:
             continue
+        seen.add(key)
 
         candidates.append(it)
 
     # Если всё "съедено" used_urls — разрешаем повтор, но без мусора
     if len(candidates) < 3:
         candidates = []
+        seen = set()
         for it in news:
             if not isinstance(it, dict):
                 continue
@@ -208,9 +223,13 @@ def pick_items(news: list[dict], used_urls: set[str]) -> list[dict]:
             if not url or not title:
                 continue
 
-            title_l = title.lower()
-            if any(w in title_l for w in BLOCK_WORDS):
+            if BLOCKED.match_text(title):
+                continue
+
+            key = url_key(url)
+            if key in seen:
                 continue
+            seen.add(key)
 
             candidates.append(it)
 
@@ -312,7 +331,12 @@ def main():
         print(f"Digest already posted today for slot={slot}. Exit.")
         return
 
-    used = set(state.get("used_urls", []))
+    # used_urls — ключи url_key по порядку публикации (старые в начале).
+    # Старые записи state.json — сырые ссылки, url_key приводит их к ключам.
+    used_list = list(dict.fromkeys(url_key(u) for u in state.get("used_urls", []) if u))
+    # плюс всё, что общий индекс помнит как уже взятое в дайджест
+    index = UrlIndex(URL_INDEX_PATH)
+    used = set(used_list) | {k for k, rec in index.items.items() if rec.get("digest")}
     news = read_news()
     picked = pick_items(news, used)
 
@@ -327,13 +351,23 @@ def main():
     post = make_digest_post(picked, slot)
     tg_send(post)
 
-    # обновляем used_urls
+    # обновляем used_urls и общий индекс
+    now = time.time()
     for it in picked:
         u = extract_url(it)
-        if u:
-            used.add(u)
-
-    state["used_urls"] = list(used)[-800:]  # чуть больше памяти
+        key = url_key(u) if u else ""
+        if not key:
+            continue
+        if key not in used:
+            used.add(key)
+            used_list.append(key)
+        if index.loaded:
+            index.add(key, now=now)
+            index.mark(key, "digest", now)
+    if index.loaded:
+        index.save()
+
+    state["used_urls"] = used_list[-800:]  # 800 последних — чуть больше памяти
 
     # отмечаем слот
     state.setdefault("last_post", {})